@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class BenchmarksConfig(AppConfig):
+    default_auto_field = 'django.db.models.AutoField'
+    name = 'benchmarks'
+    verbose_name = 'Замеры производительности'
@@ -0,0 +1,128 @@
+"""
+Замеряемые сценарии.
+
+Каждый сценарий — функция, которая получает BenchmarkContext
+и один раз выполняет замеряемое действие. Подготовка, которая
+не должна попадать в замер, делается в setup.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client
+
+from foodcartapp.catalog import bump_catalog_revision
+from foodcartapp.models import Order, Product
+from geo.models import AddressDistance, GeocodedAddress
+from restaurateur.views import attach_restaurant_distances
+
+
+cases = {}
+
+
+class BenchmarkError(Exception):
+    """Сценарий отработал не так, как ожидалось, и его время ничего не значит."""
+
+
+def case(name, setup=None):
+    def register(func):
+        cases[name] = (func, setup)
+        return func
+    return register
+
+
+class BenchmarkContext:
+    def __init__(self):
+        self.client = Client(HTTP_HOST='localhost')
+        user, _ = get_user_model().objects.get_or_create(
+            username='benchmark',
+            defaults={'is_staff': True},
+        )
+        self.client.force_login(user)
+        self.page_size = settings.MANAGER_ORDERS_PAGE_SIZE
+
+    def request(self, method, path, expected_status=200, **kwargs):
+        response = getattr(self.client, method)(path, **kwargs)
+        if response.status_code != expected_status:
+            raise BenchmarkError(
+                f'{method.upper()} {path}: ожидался ответ {expected_status}, '
+                f'получен {response.status_code}: {response.content[:200]!r}'
+            )
+        return response
+
+    def orders_page(self):
+        return (
+            Order.objects
+            .not_completed()
+            .order_by('status_rank', '-id')[:self.page_size]
+        )
+
+
+@case('with_available_restaurants')
+def with_available_restaurants(context):
+    list(context.orders_page().with_available_restaurants())
+
+
+def prepare_distances(context):
+    orders = list(context.orders_page().with_available_restaurants())
+    addresses = {order.address for order in orders} | {
+        restaurant.address
+        for order in orders
+        for restaurant in order.available_restaurants
+    }
+    geocoded_by_address = {
+        geo.address: geo
+        for geo in GeocodedAddress.objects.filter(address__in=addresses, lat__isnull=False)
+    }
+    for order in orders:
+        order.address_pending = False
+        order.address_not_found = False
+    context.distances_args = (orders, geocoded_by_address)
+    # Иначе со второго прогона расстояния читались бы из AddressDistance
+    # и замерялся бы только один SELECT, а не расчёт.
+    AddressDistance.objects.all().delete()
+
+
+@case('view_orders_distances', setup=prepare_distances)
+def view_orders_distances(context):
+    attach_restaurant_distances(*context.distances_args)
+
+
+@case('manager_orders_page')
+def manager_orders_page(context):
+    context.request('get', '/manager/orders/')
+
+
+@case('manager_products_page')
+def manager_products_page(context):
+    context.request('get', '/manager/products/')
+
+
+@case('product_list_api_cold', setup=lambda context: bump_catalog_revision())
+def product_list_api_cold(context):
+    context.request('get', '/api/products/')
+
+
+@case('product_list_api_warm', setup=lambda context: context.request('get', '/api/products/'))
+def product_list_api_warm(context):
+    context.request('get', '/api/products/')
+
+
+def prepare_order(context):
+    products = list(Product.objects.available().order_by('id').values_list('id', flat=True)[:3])
+    context.order_payload = {
+        'products': [{'product': product_id, 'quantity': 2} for product_id in products],
+        'firstname': 'Иван',
+        'lastname': 'Замеров',
+        'phonenumber': '+79161234567',
+        'address': 'Москва, Нагрузочная улица, дом 1 [load]',
+    }
+
+
+@case('order_create', setup=prepare_order)
+def order_create(context):
+    context.request(
+        'post',
+        '/api/order/',
+        expected_status=201,
+        data=context.order_payload,
+        content_type='application/json',
+    )
@@ -0,0 +1,141 @@
+from datetime import datetime
+import json
+import os
+import platform
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+
+from benchmarks.cases import BenchmarkError, cases
+from benchmarks.runner import compare, parse_grid, run
+
+
+BENCHMARKS_DIR = os.path.join(settings.BASE_DIR, 'benchmarks')
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет подбор ресторанов, расчёт расстояний, страницы менеджера, каталог '
+        'и создание заказа на сетке объёмов данных. Работает на отдельной тестовой БД'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grid',
+            default='500x10x100,2000x30x300',
+            help='Объёмы данных через запятую: заказы x рестораны x товары',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--cases',
+            default=None,
+            help=f"Какие сценарии запускать через запятую, по умолчанию все: {', '.join(cases)}",
+        )
+        parser.add_argument('--output', default=None, help='Куда сохранить результаты в JSON')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Сохранить результаты как новые базовые',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=20.0,
+            help='На сколько процентов сценарий может замедлиться относительно базовых замеров',
+        )
+
+    def handle(self, *args, **options):
+        selected_cases = cases
+        if options['cases']:
+            names = [name.strip() for name in options['cases'].split(',')]
+            unknown = set(names) - cases.keys()
+            if unknown:
+                raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+            selected_cases = {name: cases[name] for name in names}
+
+        try:
+            grid = parse_grid(options['grid'])
+        except ValueError:
+            raise CommandError('--grid: ожидаются точки вида 1000x20x200 через запятую')
+
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            vendor = connection.vendor
+            results = run(selected_cases, grid, options['repeat'], options['seed'], stdout=self.stdout)
+        except BenchmarkError as e:
+            raise CommandError(e)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        report = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': vendor,
+                'grid': options['grid'],
+                'repeat': options['repeat'],
+                'seed': options['seed'],
+            },
+            'results': results,
+        }
+
+        output = options['output'] or os.path.join(
+            DEFAULT_RESULTS_DIR,
+            f"{datetime.now():%Y%m%d-%H%M%S}.json",
+        )
+        self.write_report(output, report)
+        self.stdout.write(f'Результаты сохранены в {output}')
+
+        if options['save_baseline']:
+            self.write_report(options['baseline'], report)
+            self.stdout.write(f"Базовые замеры сохранены в {options['baseline']}")
+            return
+
+        if not os.path.exists(options['baseline']):
+            self.stdout.write('Базовых замеров нет, сравнивать не с чем. Сохраните их с --save-baseline')
+            return
+
+        with open(options['baseline'], encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        comparisons = compare(results, baseline['results'], options['threshold'])
+
+        regressions = []
+        for comparison in comparisons:
+            line = f"{comparison['grid']:>16} {comparison['case']:<28} "
+            if comparison['status'] == 'new':
+                self.stdout.write(self.style.WARNING(f'{line}новый, в базовых замерах его нет'))
+                continue
+            if comparison['status'] == 'missing':
+                self.stdout.write(self.style.WARNING(f'{line}есть в базовых замерах, но не запускался'))
+                continue
+
+            line += (
+                f"лучшее {comparison['baseline_ms']:>10.2f} -> {comparison['min_ms']:>10.2f} мс "
+                f"({comparison['change_percent']:+.1f}%), "
+                f"SQL {comparison['baseline_queries']} -> {comparison['queries']}"
+            )
+            if comparison['status'] == 'regression':
+                regressions.append(comparison)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(
+                f"Замедлилось сценариев: {len(regressions)} "
+                f"(порог {options['threshold']}% или рост числа SQL-запросов)"
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def write_report(self, path, report):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
@@ -0,0 +1,145 @@
+from io import StringIO
+import statistics
+import time
+import tracemalloc
+
+from django.core.management import call_command
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+from geo.cache import coordinates_cache
+from geo.spatial import reset_restaurant_spatial_index
+
+from .cases import BenchmarkContext
+
+
+def parse_grid(grid):
+    """Разбирает сетку вида «1000x20x200,5000x50x500» (заказы × рестораны × товары)."""
+    points = []
+    for point in grid.split(','):
+        orders, restaurants, products = (int(value) for value in point.strip().lower().split('x'))
+        points.append((orders, restaurants, products))
+    return points
+
+
+def format_grid_point(point):
+    return 'x'.join(str(value) for value in point)
+
+
+def load_grid_point(point, seed):
+    orders, restaurants, products = point
+    # Каждая точка сетки начинается с пустой БД: заказы, созданные
+    # сценариями, ссылаются на сгенерированные товары и не дали бы их удалить.
+    call_command('flush', interactive=False, verbosity=0)
+    call_command(
+        'generate_load_data',
+        orders=orders,
+        restaurants=restaurants,
+        products=products,
+        seed=seed,
+        stdout=StringIO(),
+    )
+    coordinates_cache.clear()
+    reset_restaurant_spatial_index()
+
+
+def measure(func, setup, context, repeat):
+    # Прогрев: первый вызов заполняет кеши шаблонов, URL и соединения.
+    if setup:
+        setup(context)
+    func(context)
+
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup(context)
+        started_at = time.perf_counter()
+        func(context)
+        timings.append(time.perf_counter() - started_at)
+
+    # Запросы и память считаем отдельными прогонами: tracemalloc исказил бы
+    # время, а журнал запросов CaptureQueriesContext — замер памяти.
+    if setup:
+        setup(context)
+    # При DEBUG журнал запросов соединения ограничен 9000 записей и после
+    # генерации данных уже полон: без сброса новые запросы в нём не видны.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        func(context)
+    # Запросы CaptureQueriesContext читает из журнала соединения, а следующий
+    # HTTP-запрос его очистит, поэтому считаем сразу.
+    queries_count = len(queries)
+
+    if setup:
+        setup(context)
+    tracemalloc.start()
+    try:
+        func(context)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'min_ms': round(min(timings) * 1000, 3),
+        'max_ms': round(max(timings) * 1000, 3),
+        'queries': queries_count,
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+    }
+
+
+def run(cases, grid, repeat, seed, stdout=None):
+    results = []
+    for point in grid:
+        load_grid_point(point, seed)
+        context = BenchmarkContext()
+        for name, (func, setup) in cases.items():
+            result = {'case': name, 'grid': format_grid_point(point), **measure(func, setup, context, repeat)}
+            results.append(result)
+            if stdout is not None:
+                stdout.write(
+                    f"{result['grid']:>16} {name:<28} лучшее {result['min_ms']:>10.2f} мс "
+                    f"(медиана {result['median_ms']:.2f}) "
+                    f"{result['queries']:>5} SQL {result['peak_memory_kb']:>10.1f} КБ"
+                )
+    return results
+
+
+def compare(results, baseline_results, threshold):
+    """
+    Сравнивает результаты с базовыми.
+
+    Сравнивается лучшее время из повторов: оно меньше всего зависит от
+    фоновой нагрузки на машину. Регрессия — лучшее время выросло больше
+    чем на threshold процентов или стало больше SQL-запросов.
+
+    У каждого сравнения есть status: ok, regression, new — сценария нет
+    в базовых замерах, или missing — базовый замер не повторён в этом прогоне.
+    """
+    baseline = {(result['case'], result['grid']): result for result in baseline_results}
+    compared_keys = set()
+    comparisons = []
+    for result in results:
+        key = (result['case'], result['grid'])
+        compared_keys.add(key)
+        base = baseline.get(key)
+        if base is None:
+            comparisons.append({'case': result['case'], 'grid': result['grid'], 'status': 'new'})
+            continue
+        change = (result['min_ms'] - base['min_ms']) / base['min_ms'] * 100 if base['min_ms'] else 0.0
+        regression = change > threshold or result['queries'] > base['queries']
+        comparisons.append({
+            'case': result['case'],
+            'grid': result['grid'],
+            'status': 'regression' if regression else 'ok',
+            'baseline_ms': base['min_ms'],
+            'min_ms': result['min_ms'],
+            'change_percent': round(change, 1),
+            'baseline_queries': base['queries'],
+            'queries': result['queries'],
+        })
+
+    for key, base in baseline.items():
+        if key not in compared_keys:
+            comparisons.append({'case': base['case'], 'grid': base['grid'], 'status': 'missing'})
+    return comparisons
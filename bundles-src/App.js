@@ -13,6 +13,34 @@ import NoResults from "./components/NoResults";
 
 import './css/App.css';
 
+// crypto.randomUUID есть только в защищённом контексте (HTTPS или localhost)
+// и в свежих браузерах, поэтому на обычном HTTP собираем UUID v4 сами.
+function generateIdempotencyKey(){
+  if (window.crypto && typeof window.crypto.randomUUID === 'function'){
+    return window.crypto.randomUUID();
+  }
+
+  let bytes = new Uint8Array(16);
+  if (window.crypto && typeof window.crypto.getRandomValues === 'function'){
+    window.crypto.getRandomValues(bytes);
+  } else {
+    for (let i = 0; i < bytes.length; i++){
+      bytes[i] = Math.floor(Math.random() * 256);
+    }
+  }
+  bytes[6] = (bytes[6] & 0x0f) | 0x40;
+  bytes[8] = (bytes[8] & 0x3f) | 0x80;
+
+  let hex = Array.from(bytes, byte => byte.toString(16).padStart(2, '0')).join('');
+  return [
+    hex.slice(0, 8),
+    hex.slice(8, 12),
+    hex.slice(12, 16),
+    hex.slice(16, 20),
+    hex.slice(20),
+  ].join('-');
+}
+
 class App extends Component {
 
   constructor(props){
@@ -61,16 +89,31 @@ class App extends Component {
     };
 
     let csrfToken = document.querySelector("[name=csrfmiddlewaretoken]").value;
+    let body = JSON.stringify(data);
 
     try {
+      let headers = {
+        'Accept': 'application/json',
+        'Content-Type': 'application/json',
+        'X-CSRFToken': csrfToken,
+      };
+
+      // Повтор того же заказа отправляем с тем же ключом, чтобы сервер
+      // не создал дубль, если первый запрос дошёл, а ответ потерялся.
+      // Если ключ получить не удалось, заказ всё равно отправляем, просто без него.
+      try {
+        if (!this.checkoutAttempt || this.checkoutAttempt.body !== body){
+          this.checkoutAttempt = {body, key: generateIdempotencyKey()};
+        }
+        headers['Idempotency-Key'] = this.checkoutAttempt.key;
+      } catch(error){
+        console.error(error);
+      }
+
       let response = await fetch(url, {
         method: 'post',
-        headers: {
-          'Accept': 'application/json',
-          'Content-Type': 'application/json',
-          'X-CSRFToken': csrfToken,
-        },
-        body: JSON.stringify(data),
+        headers,
+        body,
       });
 
       if (!response.ok){
@@ -78,6 +121,7 @@ class App extends Component {
         return;
       }
       let responseData = await response.json();
+      this.checkoutAttempt = null;
 
       this.setState({
         cart: [],
@@ -4,9 +4,9 @@ from django.shortcuts import reverse, redirect
 from django.templatetags.static import static
 from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
-from geo.utils import fetch_coordinates
+from geo.utils import enqueue_geocoding
 
-from .models import Product, ProductCategory, Restaurant, RestaurantMenuItem, Order, OrderItem
+from .models import Banner, Product, ProductCategory, Restaurant, RestaurantMenuItem, Order, OrderItem
 
 
 class RestaurantMenuItemInline(admin.TabularInline):
@@ -30,6 +30,18 @@ class RestaurantAdmin(admin.ModelAdmin):
         RestaurantMenuItemInline
     ]
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+
+        if 'address' in form.changed_data:
+            enqueue_geocoding([obj.address])
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Позиции из инлайна уже сохранены: пересчитываем итоги заказа один раз,
+        # а не на каждую позицию.
+        Order.objects.filter(pk=form.instance.pk).update_totals()
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -123,23 +135,29 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'firstname', 'lastname', 'phonenumber', 'address', 'status', 'comment', 'created_at', 'called_at', 'delivered_at', 'payment_method', 'cooking_restaurant']
+    list_display = ['id', 'firstname', 'lastname', 'phonenumber', 'address', 'status', 'comment', 'created_at', 'called_at', 'delivered_at', 'payment_method', 'cooking_restaurant', 'items_count', 'total_price']
     list_filter = ['status', 'created_at', 'payment_method', 'cooking_restaurant']
     search_fields = ['id', 'firstname', 'lastname', 'phonenumber', 'address', 'comment']
     inlines = [OrderItemInline]
     ordering = ['-id']
-    fields = ['firstname', 'lastname', 'phonenumber', 'address', 'status', 'comment', 'created_at', 'called_at', 'delivered_at', 'payment_method', 'cooking_restaurant']
-    readonly_fields = ['created_at']
+    fields = ['firstname', 'lastname', 'phonenumber', 'address', 'status', 'comment', 'created_at', 'called_at', 'delivered_at', 'payment_method', 'cooking_restaurant', 'items_count', 'total_price']
+    readonly_fields = ['created_at', 'items_count', 'total_price']
 
     def save_model(self, request, obj, form, change):
         if obj.cooking_restaurant and obj.status == 'NEW':
             obj.status = 'COOKING'
 
-        if 'address' in form.changed_data and obj.address:
-            fetch_coordinates(obj.address)
-
         super().save_model(request, obj, form, change)
 
+        if 'address' in form.changed_data:
+            enqueue_geocoding([obj.address])
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Позиции из инлайна уже сохранены: пересчитываем итоги заказа один раз,
+        # а не на каждую позицию.
+        Order.objects.filter(pk=form.instance.pk).update_totals()
+
     def response_change(self, request, obj):
         next_url = request.GET.get('next')
         if next_url and url_has_allowed_host_and_scheme(
@@ -157,3 +175,51 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_select_related = ['order', 'product']
     search_fields = ['order__id', 'product__name']
     raw_id_fields = ['order', 'product']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        order_ids = {obj.order_id}
+        if 'order' in form.changed_data and form.initial.get('order'):
+            order_ids.add(form.initial['order'])
+        Order.objects.filter(pk__in=order_ids).update_totals()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Order.objects.filter(pk=obj.order_id).update_totals()
+
+    def delete_queryset(self, request, queryset):
+        order_ids = set(queryset.values_list('order_id', flat=True))
+        super().delete_queryset(request, queryset)
+        Order.objects.filter(pk__in=order_ids).update_totals()
+
+
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = ['get_image_list_preview', 'title', 'order', 'is_active', 'starts_at', 'ends_at']
+    list_display_links = ['title']
+    list_editable = ['order', 'is_active']
+    list_filter = ['is_active']
+    search_fields = ['title', 'text']
+    fields = ['title', 'text', 'image', 'static_path', 'get_image_preview', 'order', 'is_active', 'starts_at', 'ends_at']
+    readonly_fields = ['get_image_preview']
+
+    def get_image_url(self, obj):
+        if obj.image:
+            return obj.image.url
+        if obj.static_path:
+            return static(obj.static_path)
+        return None
+
+    def get_image_preview(self, obj):
+        url = self.get_image_url(obj)
+        if not url:
+            return 'выберите картинку'
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=url)
+    get_image_preview.short_description = 'превью'
+
+    def get_image_list_preview(self, obj):
+        url = self.get_image_url(obj)
+        if not url:
+            return 'нет картинки'
+        return format_html('<img src="{url}" style="max-height: 50px;"/>', url=url)
+    get_image_list_preview.short_description = 'превью'
@@ -0,0 +1,131 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+from .metrics import availability_index_rebuilds, cache_requests
+
+
+MENU_VERSION_CACHE_KEY = 'foodcartapp:menu_version'
+AVAILABILITY_INDEX_CACHE_KEY = 'foodcartapp:availability_index'
+
+_process_cache = {
+    'version': None,
+    'index': None,
+}
+_process_cache_lock = threading.Lock()
+
+
+class RestaurantAvailabilityIndex:
+    """
+    Матрица «товар -> рестораны, где он в продаже».
+
+    Для каждого товара хранится битовая маска: бит с номером i выставлен,
+    если товар продаётся в i-м ресторане. Рестораны, которые могут
+    приготовить корзину, получаются побитовым AND масок товаров корзины.
+    """
+
+    def __init__(self, restaurants, masks_by_product, version=None):
+        self.restaurants = restaurants
+        self.masks_by_product = masks_by_product
+        self.version = version
+
+    @classmethod
+    def build(cls, version=None):
+        from .models import Restaurant, RestaurantMenuItem
+
+        restaurants = list(Restaurant.objects.order_by('id'))
+        bit_by_restaurant_id = {
+            restaurant.id: bit
+            for bit, restaurant in enumerate(restaurants)
+        }
+
+        masks_by_product = {}
+        menu_items = (
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .values_list('product_id', 'restaurant_id')
+        )
+        for product_id, restaurant_id in menu_items:
+            bit = bit_by_restaurant_id.get(restaurant_id)
+            if bit is None:
+                continue
+            masks_by_product[product_id] = masks_by_product.get(product_id, 0) | (1 << bit)
+
+        return cls(restaurants, masks_by_product, version=version)
+
+    def mask_for(self, product_ids):
+        product_ids = set(product_ids)
+        if not product_ids:
+            return 0
+
+        mask = -1
+        for product_id in product_ids:
+            mask &= self.masks_by_product.get(product_id, 0)
+            if not mask:
+                break
+        return mask
+
+    def restaurants_for(self, product_ids):
+        """Возвращает рестораны, которые могут приготовить всю корзину."""
+        mask = self.mask_for(product_ids)
+        restaurants = []
+        while mask:
+            lowest_bit = mask & -mask
+            restaurants.append(self.restaurants[lowest_bit.bit_length() - 1])
+            mask ^= lowest_bit
+        return restaurants
+
+    def restaurant_ids_for(self, product_ids):
+        """Возвращает id ресторанов, в которых есть все товары из product_ids."""
+        return {restaurant.id for restaurant in self.restaurants_for(product_ids)}
+
+
+def get_menu_version():
+    version = cache.get(MENU_VERSION_CACHE_KEY)
+    if version is None:
+        # Начальное значение от времени, чтобы после сброса кеша номер
+        # версии не совпал с тем, что уже лежит в памяти процессов.
+        cache.add(MENU_VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        version = cache.get(MENU_VERSION_CACHE_KEY)
+    return version
+
+
+def bump_menu_version():
+    try:
+        cache.incr(MENU_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.add(MENU_VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+
+
+def get_availability_index():
+    """
+    Возвращает актуальный индекс доступности.
+
+    Индекс кешируется в памяти процесса и в кеше Django. Меню
+    перечитывается из БД, только если версия меню изменилась.
+    """
+    version = get_menu_version()
+
+    index = _process_cache['index']
+    if index is not None and _process_cache['version'] == version:
+        cache_requests.inc(cache='availability_index', result='hit')
+        return index
+
+    with _process_cache_lock:
+        if _process_cache['index'] is not None and _process_cache['version'] == version:
+            cache_requests.inc(cache='availability_index', result='hit')
+            return _process_cache['index']
+
+        index = cache.get(AVAILABILITY_INDEX_CACHE_KEY)
+        if index is None or index.version != version:
+            index = RestaurantAvailabilityIndex.build(version=version)
+            cache.set(AVAILABILITY_INDEX_CACHE_KEY, index, timeout=None)
+            cache_requests.inc(cache='availability_index', result='miss')
+            availability_index_rebuilds.inc()
+        else:
+            cache_requests.inc(cache='availability_index', result='shared_hit')
+
+        _process_cache['index'] = index
+        _process_cache['version'] = version
+        return index
@@ -0,0 +1,102 @@
+from collections import namedtuple
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.templatetags.static import static
+from django.utils import timezone
+
+from .metrics import cache_requests
+from .renderers import dumps
+
+
+BANNERS_REVISION_CACHE_KEY = 'foodcartapp:banners_revision'
+BANNERS_FEED_CACHE_KEY = 'foodcartapp:banners_feed:{revision}'
+BANNERS_FEED_TIMEOUT = 24 * 60 * 60
+
+BannersFeed = namedtuple('BannersFeed', ['payload', 'pretty_payload', 'etag', 'expires_at'])
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+
+def get_banners_revision():
+    revision = cache.get(BANNERS_REVISION_CACHE_KEY)
+    if revision is None:
+        cache.add(BANNERS_REVISION_CACHE_KEY, time.time_ns(), timeout=None)
+        revision = cache.get(BANNERS_REVISION_CACHE_KEY)
+    return revision
+
+
+def bump_banners_revision():
+    cache.set(BANNERS_REVISION_CACHE_KEY, time.time_ns(), timeout=None)
+
+
+def dump_banner(banner):
+    return {
+        'title': banner.title,
+        'src': banner.image.url if banner.image else static(banner.static_path),
+        'text': banner.text,
+    }
+
+
+def is_fresh(feed, now):
+    return feed is not None and (feed.expires_at is None or feed.expires_at > now)
+
+
+def build_banners_feed(now):
+    from .models import Banner
+
+    # Баннер без картинки вывел бы в src каталог статики целиком.
+    banners = Banner.objects.active(now).exclude(image='', static_path='')
+    data = [dump_banner(banner) for banner in banners]
+
+    # Набор баннеров меняется и без сохранения — когда наступает starts_at
+    # или ends_at. До ближайшей такой даты готовый ответ и живёт.
+    boundaries = Banner.objects.filter(is_active=True).aggregate(
+        next_start=Min('starts_at', filter=Q(starts_at__gt=now)),
+        next_end=Min('ends_at', filter=Q(ends_at__gt=now)),
+    )
+    expires_at = min(filter(None, boundaries.values()), default=None)
+
+    payload = dumps(data)
+    return BannersFeed(
+        payload=payload,
+        pretty_payload=dumps(data, pretty=True),
+        etag=hashlib.md5(payload).hexdigest(),
+        expires_at=expires_at,
+    )
+
+
+def get_banners_feed(revision):
+    """
+    Возвращает готовую ленту активных баннеров.
+
+    Лента собирается из БД один раз на ревизию и хранится в памяти процесса
+    и в кеше Django, пока не наступит начало или конец показа какого-нибудь
+    баннера.
+    """
+    now = timezone.now()
+    feed = _feeds.get(revision)
+    if is_fresh(feed, now):
+        cache_requests.inc(cache='banners', result='hit')
+        return feed
+
+    cache_key = BANNERS_FEED_CACHE_KEY.format(revision=revision)
+    feed = cache.get(cache_key)
+    if is_fresh(feed, now):
+        cache_requests.inc(cache='banners', result='shared_hit')
+    else:
+        cache_requests.inc(cache='banners', result='miss')
+        feed = build_banners_feed(now)
+        timeout = BANNERS_FEED_TIMEOUT
+        if feed.expires_at is not None:
+            timeout = min(timeout, max(1, int((feed.expires_at - now).total_seconds()) + 1))
+        cache.set(cache_key, feed, timeout=timeout)
+
+    with _feeds_lock:
+        _feeds.clear()
+        _feeds[revision] = feed
+    return feed
@@ -0,0 +1,173 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+from .metrics import cache_requests
+from .renderers import compress, dumps
+
+
+CATALOG_REVISION_CACHE_KEY = 'foodcartapp:catalog_revision'
+CATALOG_PAYLOAD_CACHE_KEY = 'foodcartapp:catalog_payload:{revision}:{variant}'
+CATALOG_PAYLOAD_SIZE_CACHE_KEY = 'foodcartapp:catalog_payload_size:{revision}:{variant}'
+CATALOG_PAYLOAD_CACHE_TIMEOUT = 24 * 60 * 60
+
+_payloads = {}
+_payload_sizes = {}
+_payloads_lock = threading.Lock()
+
+
+def get_catalog_revision():
+    """
+    Возвращает ревизию каталога.
+
+    Ревизия — время последнего изменения каталога в наносекундах, поэтому
+    она же служит датой для Last-Modified.
+    """
+    revision = cache.get(CATALOG_REVISION_CACHE_KEY)
+    if revision is None:
+        cache.add(CATALOG_REVISION_CACHE_KEY, time.time_ns(), timeout=None)
+        revision = cache.get(CATALOG_REVISION_CACHE_KEY)
+    return revision
+
+
+def bump_catalog_revision():
+    cache.set(CATALOG_REVISION_CACHE_KEY, time.time_ns(), timeout=None)
+
+
+def dump_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': product.price,
+        'special_status': product.special_status,
+        'description': product.description,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+        } if product.category else None,
+        'image': product.image.url,
+        'restaurant': {
+            'id': product.id,
+            'name': product.name,
+        }
+    }
+
+
+def dump_products(products):
+    return [dump_product(product) for product in products]
+
+
+PRODUCT_FIELDS = (
+    'id',
+    'name',
+    'price',
+    'special_status',
+    'description',
+    'category',
+    'image',
+    'restaurant',
+)
+
+
+def get_products_page(after=None, limit=50, category=None, special_status=None):
+    """
+    Возвращает страницу доступных товаров после товара с id after
+    и признак, есть ли следующая страница.
+
+    Страница выбирается по индексу первичного ключа, поэтому её цена
+    не зависит от того, насколько далеко клиент пролистал каталог.
+    """
+    from .models import Product
+
+    products = Product.objects.select_related('category').available().order_by('id')
+    if after is not None:
+        products = products.filter(id__gt=after)
+    if category is not None:
+        products = products.filter(category_id=category)
+    if special_status is not None:
+        products = products.filter(special_status=special_status)
+
+    products = list(products[:limit + 1])
+    return products[:limit], len(products) > limit
+
+
+def get_catalog_payload_size(revision, pretty=False):
+    """
+    Возвращает размер несжатого каталога ревизии в байтах.
+
+    Размер запоминается при сборке каталога, поэтому по нему можно выбрать
+    сжатие и посчитать ETag, не собирая каталог и не обращаясь к БД.
+    Если каталог этой ревизии ещё нигде не собирали, возвращает None.
+    """
+    size = _payload_sizes.get(revision, {}).get(pretty)
+    if size is not None:
+        return size
+
+    size = cache.get(CATALOG_PAYLOAD_SIZE_CACHE_KEY.format(
+        revision=revision,
+        variant='pretty' if pretty else 'compact',
+    ))
+    if size is not None:
+        _remember_payload_size(revision, pretty, size)
+    return size
+
+
+def _remember_payload_size(revision, pretty, size):
+    with _payloads_lock:
+        if revision not in _payload_sizes:
+            _payload_sizes.clear()
+            _payload_sizes[revision] = {}
+        _payload_sizes[revision][pretty] = size
+
+
+def get_catalog_payload(revision, pretty=False, encoding=None):
+    """
+    Возвращает каталог доступных товаров в виде готовых байтов JSON.
+
+    Каталог собирается из БД один раз на ревизию и хранится в памяти
+    процесса и в кеше Django. Сжатые варианты готовятся один раз
+    на ревизию и тоже не пересчитываются на каждый запрос.
+    """
+    variant = (pretty, encoding)
+    payloads = _payloads.get(revision, {})
+    payload = payloads.get(variant)
+    if payload is not None:
+        cache_requests.inc(cache='catalog', result='hit')
+        return payload
+
+    cache_key = CATALOG_PAYLOAD_CACHE_KEY.format(
+        revision=revision,
+        variant=f"{'pretty' if pretty else 'compact'}-{encoding or 'identity'}",
+    )
+    payload = cache.get(cache_key)
+    if payload is not None:
+        cache_requests.inc(cache='catalog', result='shared_hit')
+    else:
+        cache_requests.inc(cache='catalog', result='miss')
+        if encoding:
+            payload = compress(get_catalog_payload(revision, pretty=pretty), encoding)
+        else:
+            from .models import Product
+
+            products = Product.objects.select_related('category').available()
+            payload = dumps(dump_products(products), pretty=pretty)
+            cache.set(
+                CATALOG_PAYLOAD_SIZE_CACHE_KEY.format(
+                    revision=revision,
+                    variant='pretty' if pretty else 'compact',
+                ),
+                len(payload),
+                timeout=CATALOG_PAYLOAD_CACHE_TIMEOUT,
+            )
+        cache.set(cache_key, payload, timeout=CATALOG_PAYLOAD_CACHE_TIMEOUT)
+
+    if not encoding:
+        _remember_payload_size(revision, pretty, len(payload))
+
+    with _payloads_lock:
+        if revision not in _payloads:
+            _payloads.clear()
+            _payloads[revision] = {}
+        _payloads[revision][variant] = payload
+    return payload
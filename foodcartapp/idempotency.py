@@ -0,0 +1,43 @@
+from datetime import timedelta
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+
+def get_request_fingerprint(request):
+    # Читаем сырое тело до request.data: после разбора DRF его уже не получить.
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def get_idempotency_record(key, now=None):
+    """Возвращает сохранённый ответ для ключа, если срок его хранения не истёк."""
+    now = now or timezone.now()
+    return IdempotencyKey.objects.filter(key=key, expires_at__gt=now).first()
+
+
+def save_idempotency_record(key, fingerprint, response, order=None, now=None):
+    """
+    Сохраняет ответ под ключом.
+
+    Вызывается в той же транзакции, что и создание заказа: параллельный
+    запрос с тем же ключом упрётся в уникальный индекс и дождётся коммита,
+    а если заказ не создастся, ключ не сохранится вместе с ним.
+    """
+    now = now or timezone.now()
+    ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', IDEMPOTENCY_KEY_TTL)
+    IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+    return IdempotencyKey.objects.create(
+        key=key,
+        request_fingerprint=fingerprint,
+        response_status=response.status_code,
+        response_body=response.data,
+        order=order,
+        expires_at=now + timedelta(seconds=ttl),
+    )
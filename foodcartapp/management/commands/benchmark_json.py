@@ -0,0 +1,70 @@
+import json
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from foodcartapp.catalog import dump_products
+from foodcartapp.models import Product
+from foodcartapp.renderers import BROTLI, GZIP, brotli, compress, dumps, orjson
+
+
+def make_products(count):
+    return [
+        {
+            'id': number,
+            'name': f'Бургер №{number}',
+            'price': Decimal('349.00') + number,
+            'special_status': number % 5 == 0,
+            'description': 'Сочная котлета, свежие овощи и фирменный соус. ' * 3,
+            'category': {'id': number % 7, 'name': 'Бургеры'},
+            'image': f'/media/burger-{number}.jpg',
+            'restaurant': {'id': number, 'name': f'Бургер №{number}'},
+        }
+        for number in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает размер и время сериализации ответа со списком товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=0,
+            help='Сколько товаров сгенерировать. По умолчанию берётся каталог из БД',
+        )
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options['products']:
+            data = make_products(options['products'])
+        else:
+            data = dump_products(Product.objects.select_related('category').available())
+        self.stdout.write(f'Товаров в ответе: {len(data)}, повторов: {options["repeat"]}')
+
+        encoders = [
+            ('json, indent=4 (как было)', lambda: json.dumps(
+                data, cls=DjangoJSONEncoder, ensure_ascii=False, indent=4,
+            ).encode()),
+            ('dumps, компактно', lambda: dumps(data)),
+            ('dumps, ?pretty=1', lambda: dumps(data, pretty=True)),
+        ]
+        for name, encode in encoders:
+            self.measure(name, encode, options['repeat'])
+        if orjson is None:
+            self.stdout.write('orjson не установлен, dumps работает через стандартный json')
+
+        body = dumps(data)
+        encodings = [GZIP] + ([BROTLI] if brotli is not None else [])
+        for encoding in encodings:
+            self.measure(f'{encoding} компактного ответа', lambda: compress(body, encoding), options['repeat'])
+
+    def measure(self, name, func, repeat):
+        started_at = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        elapsed = (time.perf_counter() - started_at) / repeat
+        self.stdout.write(f'{name}: {len(result)} байт, {elapsed * 1e6:.0f} мкс на ответ')
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Case, IntegerField, Value, When
+
+from foodcartapp.models import Order
+
+
+def get_case_when_query(page_size):
+    """Запрос страницы заказов в том виде, в каком он был до status_rank."""
+    status_order = Case(
+        When(status='UNPROCESSED', then=Value(0)),
+        When(status='NEW', then=Value(1)),
+        When(status='COOKING', then=Value(2)),
+        When(status='DELIVERING', then=Value(3)),
+        When(status='COMPLETED', then=Value(4)),
+        default=Value(5),
+        output_field=IntegerField(),
+    )
+    return (
+        Order.objects
+        .annotate(status_priority=status_order)
+        .exclude(status='COMPLETED')
+        .order_by('status_priority', '-id')[:page_size]
+    )
+
+
+def get_status_rank_query(page_size):
+    return Order.objects.not_completed().order_by('status_rank', '-id')[:page_size]
+
+
+class Command(BaseCommand):
+    help = 'Показывает EXPLAIN и время запроса страницы заказов до и после status_rank'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=100)
+
+    def handle(self, *args, **options):
+        queries = [
+            ('До: сортировка по Case/When', get_case_when_query),
+            ('После: сортировка по status_rank', get_status_rank_query),
+        ]
+        self.stdout.write(f'Заказов в БД: {Order.objects.count()}')
+        for title, get_query in queries:
+            query = get_query(options['page_size'])
+            self.stdout.write(f'\n{title}')
+            self.stdout.write(query.explain())
+
+            started_at = time.perf_counter()
+            for _ in range(options['repeat']):
+                list(get_query(options['page_size']).values_list('id', flat=True))
+            elapsed = (time.perf_counter() - started_at) / options['repeat']
+            self.stdout.write(f'Среднее время: {elapsed * 1000:.2f} мс')
@@ -0,0 +1,290 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.utils import timezone
+
+from foodcartapp import signals
+from foodcartapp.availability import bump_menu_version
+from foodcartapp.banners import bump_banners_revision
+from foodcartapp.catalog import bump_catalog_revision
+from foodcartapp.models import (
+    Order,
+    OrderItem,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from geo.models import GeocodedAddress
+from geo.normalization import normalize_address
+
+
+LOAD_DATA_MARK = '[load]'
+
+MOSCOW_LAT, MOSCOW_LNG = 55.75, 37.62
+
+MENU_DENSITIES = {
+    'sparse': 0.1,
+    'dense': 0.9,
+}
+
+# Доли статусов и размеров корзин примерно как в живой базе:
+# большинство заказов уже завершены, в корзине обычно 1–3 товара.
+STATUS_WEIGHTS = {
+    'UNPROCESSED': 10,
+    'NEW': 8,
+    'COOKING': 5,
+    'DELIVERING': 7,
+    'COMPLETED': 70,
+}
+BASKET_SIZE_WEIGHTS = {1: 30, 2: 30, 3: 18, 4: 10, 5: 6, 6: 3, 8: 2, 12: 1}
+QUANTITY_WEIGHTS = {1: 70, 2: 22, 3: 6, 5: 2}
+
+
+CACHE_INVALIDATION_RECEIVERS = [
+    (signals.invalidate_availability_index, Restaurant),
+    (signals.invalidate_availability_index, RestaurantMenuItem),
+    (signals.invalidate_catalog, Product),
+    (signals.invalidate_catalog, ProductCategory),
+    (signals.invalidate_catalog, RestaurantMenuItem),
+]
+
+
+@contextmanager
+def disconnected(signal, receivers):
+    """Временно отключает обработчики сигнала — пары (обработчик, отправитель)."""
+    for receiver, sender in receivers:
+        signal.disconnect(receiver, sender=sender)
+    try:
+        yield
+    finally:
+        for receiver, sender in receivers:
+            signal.connect(receiver, sender=sender)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт рестораны, товары, меню и заказы для нагрузочного тестирования. '
+        'При одинаковых параметрах и --seed данные получаются одинаковыми'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=20)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument(
+            '--menu',
+            default='sparse',
+            help='Плотность меню: sparse, dense или доля от 0 до 1 — '
+                 'какую часть товаров продаёт каждый ресторан',
+        )
+        parser.add_argument(
+            '--addresses',
+            type=int,
+            default=None,
+            help='Сколько разных адресов доставки. По умолчанию треть от числа заказов',
+        )
+        parser.add_argument(
+            '--geocoded-share',
+            type=float,
+            default=0.9,
+            help='Доля адресов доставки, для которых сразу создаются координаты',
+        )
+        parser.add_argument('--days', type=int, default=90, help='За сколько дней разбросать заказы')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help=f'Сначала удалить данные, созданные этой командой (с пометкой {LOAD_DATA_MARK})',
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        menu_density = self.parse_menu_density(options['menu'])
+        started_at = time.perf_counter()
+
+        if options['clear']:
+            self.clear()
+
+        restaurants = self.create_restaurants(options['restaurants'])
+        products = self.create_products(options['categories'], options['products'])
+        menu_items_count = self.create_menu(restaurants, products, menu_density)
+
+        addresses_count = options['addresses'] or max(1, options['orders'] // 3)
+        addresses = [f'Москва, Нагрузочная улица, дом {number} {LOAD_DATA_MARK}' for number in range(addresses_count)]
+        geocoded_count = self.create_geocoded_addresses(
+            addresses[:round(addresses_count * options['geocoded_share'])]
+        )
+        orders_count, items_count = self.create_orders(options['orders'], products, addresses, options['days'])
+
+        bump_menu_version()
+        bump_catalog_revision()
+        bump_banners_revision()
+
+        self.stdout.write(
+            f'Создано: ресторанов {len(restaurants)}, товаров {len(products)}, '
+            f'позиций меню {menu_items_count}, адресов с координатами {geocoded_count}, '
+            f'заказов {orders_count}, позиций заказов {items_count} '
+            f'за {time.perf_counter() - started_at:.1f} с'
+        )
+
+    def parse_menu_density(self, menu):
+        if menu in MENU_DENSITIES:
+            return MENU_DENSITIES[menu]
+        try:
+            density = float(menu)
+        except ValueError:
+            raise CommandError(f'--menu: ожидается sparse, dense или число от 0 до 1, получено {menu!r}')
+        if not 0 < density <= 1:
+            raise CommandError('--menu: доля должна быть больше 0 и не больше 1')
+        return density
+
+    @transaction.atomic
+    def clear(self):
+        # Кеши сбрасываются в конце генерации, так что сигналы сброса на каждую
+        # удалённую строку не нужны. Без них Django удаляет позиции меню
+        # одним DELETE, не загружая их. Позиции заказов сигналов не имеют
+        # и удаляются вместе с заказами так же.
+        with disconnected(post_delete, CACHE_INVALIDATION_RECEIVERS):
+            _, deleted = Order.objects.filter(comment=LOAD_DATA_MARK).delete()
+            RestaurantMenuItem.objects.filter(restaurant__name__endswith=LOAD_DATA_MARK).delete()
+            Product.objects.filter(name__endswith=LOAD_DATA_MARK).delete()
+            ProductCategory.objects.filter(name__endswith=LOAD_DATA_MARK).delete()
+            Restaurant.objects.filter(name__endswith=LOAD_DATA_MARK).delete()
+        GeocodedAddress.objects.filter(address__endswith=LOAD_DATA_MARK).delete()
+        self.stdout.write(f"Удалены данные прошлой генерации, заказов: {deleted.get('foodcartapp.Order', 0)}")
+
+    def random_coords(self):
+        return (
+            round(MOSCOW_LAT + self.rng.uniform(-0.3, 0.3), 6),
+            round(MOSCOW_LNG + self.rng.uniform(-0.5, 0.5), 6),
+        )
+
+    def create_restaurants(self, count):
+        restaurants = [
+            Restaurant(
+                name=f'Ресторан {number} {LOAD_DATA_MARK}',
+                address=f'Москва, Ресторанная улица, дом {number} {LOAD_DATA_MARK}',
+                contact_phone=f'+7495{self.rng.randrange(10 ** 7):07d}',
+            )
+            for number in range(count)
+        ]
+        restaurants = Restaurant.objects.bulk_create(restaurants, batch_size=self.chunk_size)
+        self.create_geocoded_addresses([restaurant.address for restaurant in restaurants])
+        return restaurants
+
+    def create_products(self, categories_count, count):
+        categories = ProductCategory.objects.bulk_create(
+            [ProductCategory(name=f'Категория {number} {LOAD_DATA_MARK}') for number in range(categories_count)],
+            batch_size=self.chunk_size,
+        )
+        products = [
+            Product(
+                name=f'Товар {number} {LOAD_DATA_MARK}',
+                category=self.rng.choice(categories) if categories else None,
+                price=Decimal(self.rng.randrange(99, 1500)),
+                image='burger.jpg',
+                special_status=self.rng.random() < 0.05,
+                description='Сгенерировано для нагрузочного тестирования',
+            )
+            for number in range(count)
+        ]
+        return Product.objects.bulk_create(products, batch_size=self.chunk_size)
+
+    def create_menu(self, restaurants, products, density):
+        menu_items = []
+        count = 0
+        for restaurant in restaurants:
+            for product in products:
+                if self.rng.random() >= density:
+                    continue
+                menu_items.append(RestaurantMenuItem(
+                    restaurant=restaurant,
+                    product=product,
+                    availability=self.rng.random() < 0.95,
+                ))
+                if len(menu_items) >= self.chunk_size:
+                    count += len(RestaurantMenuItem.objects.bulk_create(menu_items))
+                    menu_items = []
+        count += len(RestaurantMenuItem.objects.bulk_create(menu_items))
+        return count
+
+    def create_geocoded_addresses(self, addresses):
+        geos = []
+        for address in addresses:
+            lat, lng = self.random_coords()
+            geos.append(GeocodedAddress(
+                address=address,
+                normalized_address=normalize_address(address),
+                lat=lat,
+                lng=lng,
+                provider='load',
+            ))
+        GeocodedAddress.objects.bulk_create(geos, batch_size=self.chunk_size, ignore_conflicts=True)
+        return len(geos)
+
+    def create_orders(self, count, products, addresses, days):
+        if count and not products:
+            raise CommandError('Для заказов нужен хотя бы один товар')
+
+        statuses = list(STATUS_WEIGHTS)
+        status_weights = list(STATUS_WEIGHTS.values())
+        basket_sizes = list(BASKET_SIZE_WEIGHTS)
+        basket_size_weights = list(BASKET_SIZE_WEIGHTS.values())
+        quantities = list(QUANTITY_WEIGHTS)
+        quantity_weights = list(QUANTITY_WEIGHTS.values())
+        now = timezone.now()
+
+        orders_count = 0
+        items_count = 0
+        for chunk_start in range(0, count, self.chunk_size):
+            orders = []
+            baskets = []
+            for _ in range(chunk_start, min(count, chunk_start + self.chunk_size)):
+                basket_size = min(len(products), self.rng.choices(basket_sizes, basket_size_weights)[0])
+                basket = [
+                    (product, self.rng.choices(quantities, quantity_weights)[0])
+                    for product in self.rng.sample(products, basket_size)
+                ]
+                orders.append(Order(
+                    firstname=f'Клиент{self.rng.randrange(100000)}',
+                    lastname='Нагрузочный',
+                    phonenumber=f'+7916{self.rng.randrange(10 ** 7):07d}',
+                    address=self.rng.choice(addresses),
+                    status=self.rng.choices(statuses, status_weights)[0],
+                    payment_method=self.rng.choice(Order.PAYMENT_METHOD_CHOICES)[0],
+                    comment=LOAD_DATA_MARK,
+                    total_price=sum(product.price * quantity for product, quantity in basket),
+                    items_count=sum(quantity for _, quantity in basket),
+                ))
+                baskets.append(basket)
+
+            with transaction.atomic():
+                orders = Order.objects.bulk_create(orders)
+                items = [
+                    OrderItem(order=order, product=product, quantity=quantity, price_snapshot=product.price)
+                    for order, basket in zip(orders, baskets)
+                    for product, quantity in basket
+                ]
+                OrderItem.objects.bulk_create(items)
+
+                # created_at проставляется при вставке, поэтому разбрасываем
+                # даты отдельным обновлением.
+                for order in orders:
+                    order.created_at = now - timedelta(seconds=self.rng.randrange(days * 24 * 60 * 60 or 1))
+                Order.objects.bulk_update(orders, ['created_at'])
+
+            orders_count += len(orders)
+            items_count += len(items)
+            self.stdout.write(f'Заказов создано: {orders_count} из {count}')
+
+        return orders_count, items_count
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Q
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Сверяет сохранённые суммы и количество позиций заказов с OrderItem и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить, ничего не исправлять. Завершается с ошибкой, если есть расхождения',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        mismatched_ids = list(
+            Order.objects
+            .with_calculated_totals()
+            .filter(
+                ~Q(total_price=F('calculated_total_price'))
+                | ~Q(items_count=F('calculated_items_count'))
+            )
+            .values_list('id', flat=True)
+        )
+        self.stdout.write(f'Заказов с расхождениями: {len(mismatched_ids)}')
+
+        if options['check']:
+            if mismatched_ids:
+                raise CommandError(f'Расходятся заказы: {mismatched_ids[:20]}')
+            return
+
+        batch_size = options['batch_size']
+        for start in range(0, len(mismatched_ids), batch_size):
+            with transaction.atomic():
+                Order.objects.filter(id__in=mismatched_ids[start:start + batch_size]).update_totals()
+
+        self.stdout.write(f'Пересчитано заказов: {len(mismatched_ids)}')
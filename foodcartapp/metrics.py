@@ -0,0 +1,17 @@
+from star_burger.metrics import Counter
+
+
+orders_created = Counter(
+    'star_burger_orders_created_total',
+    'Созданные через API заказы: order — по одному, batch — пачками от партнёров',
+    labelnames=['source'],
+)
+cache_requests = Counter(
+    'star_burger_cache_requests_total',
+    'Обращения к кешам: hit — из памяти процесса, shared_hit — из кеша Django, miss — собрано по БД',
+    labelnames=['cache', 'result'],
+)
+availability_index_rebuilds = Counter(
+    'star_burger_availability_index_rebuilds_total',
+    'Пересборки индекса доступности ресторанов по БД',
+)
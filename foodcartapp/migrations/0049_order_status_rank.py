@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:58
+
+from django.db import migrations, models
+
+
+STATUS_RANKS = {
+    'UNPROCESSED': 0,
+    'NEW': 1,
+    'COOKING': 2,
+    'DELIVERING': 3,
+    'COMPLETED': 4,
+}
+
+
+def fill_status_rank(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    for status, rank in STATUS_RANKS.items():
+        Order.objects.filter(status=status).update(status_rank=rank)
+    Order.objects.exclude(status__in=STATUS_RANKS).update(status_rank=len(STATUS_RANKS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0048_remove_order_location_remove_restaurant_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='status_rank',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Порядок статуса'),
+        ),
+        migrations.RunPython(fill_status_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status_rank', '-id'], name='order_status_rank_id_idx'),
+        ),
+    ]
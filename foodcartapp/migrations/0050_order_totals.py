@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:00
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_order_totals(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderItem = apps.get_model('foodcartapp', 'OrderItem')
+
+    items = OrderItem.objects.filter(order=OuterRef('pk')).values('order')
+    total_price = items.annotate(total=Sum(F('quantity') * F('price_snapshot'))).values('total')
+    items_count = items.annotate(count=Sum('quantity')).values('count')
+    Order.objects.update(
+        total_price=Coalesce(
+            Subquery(total_price, output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            Value(0),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        items_count=Coalesce(
+            Subquery(items_count, output_field=models.IntegerField()),
+            Value(0),
+            output_field=models.IntegerField(),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0049_order_status_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество позиций'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Сумма заказа'),
+        ),
+        migrations.RunPython(fill_order_totals, migrations.RunPython.noop),
+    ]
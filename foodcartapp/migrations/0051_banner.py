@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:05
+
+from django.db import migrations, models
+
+
+BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def create_banners(apps, schema_editor):
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    Banner.objects.bulk_create([
+        Banner(title=title, static_path=static_path, text=text, order=order)
+        for order, (title, static_path, text) in enumerate(BANNERS)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0050_order_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Banner',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100, verbose_name='заголовок')),
+                ('text', models.CharField(blank=True, max_length=200, verbose_name='текст')),
+                ('image', models.ImageField(blank=True, upload_to='', verbose_name='картинка')),
+                ('static_path', models.CharField(blank=True, help_text='Используется, если картинка не загружена, например burger.jpg', max_length=200, verbose_name='картинка из статики')),
+                ('order', models.PositiveIntegerField(db_index=True, default=0, verbose_name='порядок')),
+                ('is_active', models.BooleanField(default=True, verbose_name='показывать')),
+                ('starts_at', models.DateTimeField(blank=True, null=True, verbose_name='показывать с')),
+                ('ends_at', models.DateTimeField(blank=True, null=True, verbose_name='показывать до')),
+            ],
+            options={
+                'verbose_name': 'баннер',
+                'verbose_name_plural': 'баннеры',
+                'ordering': ['order', 'id'],
+            },
+        ),
+        migrations.RunPython(create_banners, migrations.RunPython.noop),
+    ]
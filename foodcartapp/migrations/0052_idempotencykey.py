@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:07
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0051_banner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='ключ')),
+                ('request_fingerprint', models.CharField(max_length=64, verbose_name='отпечаток запроса')),
+                ('response_status', models.PositiveSmallIntegerField(verbose_name='статус ответа')),
+                ('response_body', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='тело ответа')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создан')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='действует до')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='idempotency_keys', to='foodcartapp.order', verbose_name='заказ')),
+            ],
+            options={
+                'verbose_name': 'ключ идемпотентности',
+                'verbose_name_plural': 'ключи идемпотентности',
+            },
+        ),
+    ]
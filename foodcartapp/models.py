@@ -1,9 +1,12 @@
 from django.db import models
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from phonenumber_field.modelfields import PhoneNumberField
-from django.db.models import Sum, F, DecimalField, Value
+from django.db.models import Sum, F, DecimalField, OuterRef, Subquery, Value
 from django.db.models.functions import Coalesce
-from collections import defaultdict
+
+from .availability import get_availability_index
 
 
 class Restaurant(models.Model):
@@ -127,53 +130,93 @@ class RestaurantMenuItem(models.Model):
         return f"{self.restaurant.name} - {self.product.name}"
 
 
+def get_order_total_price_subquery():
+    total_price = (
+        OrderItem.objects
+        .filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(total=Sum(F('quantity') * F('price_snapshot')))
+        .values('total')
+    )
+    return Coalesce(
+        Subquery(total_price, output_field=DecimalField(max_digits=12, decimal_places=2)),
+        Value(0),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def get_order_items_count_subquery():
+    items_count = (
+        OrderItem.objects
+        .filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(count=Sum('quantity'))
+        .values('count')
+    )
+    return Coalesce(
+        Subquery(items_count, output_field=models.IntegerField()),
+        Value(0),
+        output_field=models.IntegerField(),
+    )
+
+
 class OrderQuerySet(models.QuerySet):
-    def with_total_price(self):
-        total_expr = Sum(
-            F('items__quantity') * F('items__price_snapshot'),
-            output_field=DecimalField(max_digits=12, decimal_places=2),
-        )
+    def update(self, **kwargs):
+        if 'status' in kwargs and 'status_rank' not in kwargs:
+            kwargs['status_rank'] = Order.get_status_rank(kwargs['status'])
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for order in objs:
+            order.status_rank = Order.get_status_rank(order.status)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if 'status' in fields and 'status_rank' not in fields:
+            for order in objs:
+                order.status_rank = Order.get_status_rank(order.status)
+            fields.append('status_rank')
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def not_completed(self):
+        return self.filter(status_rank__lt=Order.get_status_rank('COMPLETED'))
+
+    def with_calculated_totals(self):
+        """Считает сумму и число позиций по OrderItem, не глядя на сохранённые поля."""
         return self.annotate(
-            total_price=Coalesce(
-                total_expr,
-                Value(0),
-                output_field=DecimalField(max_digits=12, decimal_places=2),
-            )
+            calculated_total_price=get_order_total_price_subquery(),
+            calculated_items_count=get_order_items_count_subquery(),
         )
 
-    def with_available_restaurants(self):
+    def update_totals(self):
+        """
+        Пересчитывает сохранённые сумму и число позиций одним UPDATE.
+
+        Сигналов на OrderItem нет: итоги пересчитывают те, кто меняет позиции, —
+        создание заказа через API и админка. После правок в обход них
+        поможет `manage.py recalculate_order_totals`.
+        """
+        return self.update(
+            total_price=get_order_total_price_subquery(),
+            items_count=get_order_items_count_subquery(),
+        )
+
+    def with_available_restaurants(self, availability_index=None):
         qs = self.prefetch_related('items__product')
         orders = list(qs)
 
         if not orders:
             return qs
 
-        menu_items = (
-            RestaurantMenuItem.objects
-            .filter(availability=True)
-            .select_related("restaurant")
-        )
-
-        restaurants_products = defaultdict(set)
-        restaurants_by_id = {}
-
-        for item in menu_items:
-            restaurants_products[item.restaurant_id].add(item.product_id)
-            restaurants_by_id[item.restaurant_id] = item.restaurant
+        if availability_index is None:
+            availability_index = get_availability_index()
 
         for order in orders:
             order_product_ids = {item.product_id for item in order.items.all()}
-
-            if not order_product_ids:
-                order.available_restaurants = []
-                continue
-
-            available = []
-            for restaurant_id, product_ids in restaurants_products.items():
-                if order_product_ids.issubset(product_ids):
-                    available.append(restaurants_by_id[restaurant_id])
-
-            order.available_restaurants = available
+            order.available_restaurants = availability_index.restaurants_for(order_product_ids)
 
         return qs
 
@@ -186,6 +229,13 @@ class Order(models.Model):
         ('DELIVERING', 'Доставляется'),
         ('COMPLETED', 'Завершён'),
     ]
+    STATUS_RANKS = {
+        'UNPROCESSED': 0,
+        'NEW': 1,
+        'COOKING': 2,
+        'DELIVERING': 3,
+        'COMPLETED': 4,
+    }
     PAYMENT_METHOD_CHOICES = [
         ('CASH', 'Наличными'),
         ('ONLINE', 'Электронно'),
@@ -225,6 +275,11 @@ class Order(models.Model):
         default='UNPROCESSED',
         db_index=True
     )
+    status_rank = models.PositiveSmallIntegerField(
+        verbose_name='Порядок статуса',
+        default=0,
+        editable=False,
+    )
     comment = models.TextField(
         verbose_name='Комментарий',
         blank=True,
@@ -262,6 +317,18 @@ class Order(models.Model):
         on_delete=models.SET_NULL,
         related_name='orders',
     )
+    total_price = models.DecimalField(
+        verbose_name='Сумма заказа',
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+    )
+    items_count = models.PositiveIntegerField(
+        verbose_name='Количество позиций',
+        default=0,
+        editable=False,
+    )
 
     objects = OrderQuerySet.as_manager()
 
@@ -269,10 +336,24 @@ class Order(models.Model):
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ['-id']
+        indexes = [
+            models.Index(fields=['status_rank', '-id'], name='order_status_rank_id_idx'),
+        ]
 
     def __str__(self):
         return f'Заказ {self.id} ({self.firstname} {self.lastname})'
 
+    @classmethod
+    def get_status_rank(cls, status):
+        return cls.STATUS_RANKS.get(status, len(cls.STATUS_RANKS))
+
+    def save(self, *args, **kwargs):
+        self.status_rank = self.get_status_rank(self.status)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'status_rank'}
+        super().save(*args, **kwargs)
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(
@@ -312,3 +393,110 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f'{self.product.name} ({self.quantity} шт.)'
+
+
+class BannerQuerySet(models.QuerySet):
+    def active(self, now):
+        return (
+            self
+            .filter(is_active=True)
+            .filter(models.Q(starts_at__isnull=True) | models.Q(starts_at__lte=now))
+            .filter(models.Q(ends_at__isnull=True) | models.Q(ends_at__gt=now))
+        )
+
+
+class Banner(models.Model):
+    title = models.CharField(
+        'заголовок',
+        max_length=100,
+    )
+    text = models.CharField(
+        'текст',
+        max_length=200,
+        blank=True,
+    )
+    image = models.ImageField(
+        'картинка',
+        blank=True,
+    )
+    static_path = models.CharField(
+        'картинка из статики',
+        max_length=200,
+        blank=True,
+        help_text='Используется, если картинка не загружена, например burger.jpg',
+    )
+    order = models.PositiveIntegerField(
+        'порядок',
+        default=0,
+        db_index=True,
+    )
+    is_active = models.BooleanField(
+        'показывать',
+        default=True,
+    )
+    starts_at = models.DateTimeField(
+        'показывать с',
+        null=True,
+        blank=True,
+    )
+    ends_at = models.DateTimeField(
+        'показывать до',
+        null=True,
+        blank=True,
+    )
+
+    objects = BannerQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['order', 'id']
+
+    def __str__(self):
+        return self.title
+
+    def clean(self):
+        if not self.image and not self.static_path:
+            raise ValidationError('Загрузите картинку или укажите картинку из статики')
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField(
+        'ключ',
+        max_length=255,
+        unique=True,
+    )
+    request_fingerprint = models.CharField(
+        'отпечаток запроса',
+        max_length=64,
+    )
+    response_status = models.PositiveSmallIntegerField(
+        'статус ответа',
+    )
+    response_body = models.JSONField(
+        'тело ответа',
+        encoder=DjangoJSONEncoder,
+    )
+    order = models.ForeignKey(
+        Order,
+        verbose_name='заказ',
+        related_name='idempotency_keys',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    created_at = models.DateTimeField(
+        'создан',
+        auto_now_add=True,
+    )
+    expires_at = models.DateTimeField(
+        'действует до',
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'ключ идемпотентности'
+        verbose_name_plural = 'ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,107 @@
+import gzip
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+JSON_COMPRESSION_THRESHOLD = 1024
+GZIP = 'gzip'
+BROTLI = 'br'
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def _default(obj):
+    # Decimal, даты и прочее сериализуем так же, как DjangoJSONEncoder,
+    # чтобы ответы не зависели от того, установлен ли orjson.
+    return _django_encoder.default(obj)
+
+
+def dumps(data, pretty=False):
+    """Сериализует data в байты JSON: компактно или, если pretty, с отступами."""
+    if orjson is not None:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=option)
+
+    if pretty:
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2).encode()
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def wants_pretty(request):
+    return request is not None and request.GET.get('pretty') == '1'
+
+
+def choose_encoding(request, size=None):
+    """Выбирает сжатие, которое понимает клиент, или None, если сжимать не нужно."""
+    threshold = getattr(settings, 'JSON_COMPRESSION_THRESHOLD', JSON_COMPRESSION_THRESHOLD)
+    if request is None or (size is not None and size < threshold):
+        return None
+
+    accepted = {
+        encoding.split(';')[0].strip()
+        for encoding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+    }
+    if brotli is not None and BROTLI in accepted:
+        return BROTLI
+    if GZIP in accepted:
+        return GZIP
+    return None
+
+
+def compress(body, encoding):
+    if encoding == BROTLI:
+        return brotli.compress(body)
+    if encoding == GZIP:
+        return gzip.compress(body, mtime=0)
+    return body
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    Ответ с JSON: компактный, с отступами при ?pretty=1, сжатый,
+    если клиент это поддерживает и тело больше порога.
+
+    Вместо data можно передать уже сериализованное тело в body,
+    а если оно и сжато заранее — указать encoding.
+    """
+
+    def __init__(self, data=None, request=None, body=None, encoding=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        if body is None:
+            body = dumps(data, pretty=wants_pretty(request))
+            encoding = choose_encoding(request, len(body))
+            body = compress(body, encoding)
+
+        super().__init__(body, **kwargs)
+        if encoding:
+            self['Content-Encoding'] = encoding
+        patch_vary_headers(self, ['Accept-Encoding'])
+
+
+class FastJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        request = (renderer_context or {}).get('request')
+        return dumps(data, pretty=wants_pretty(request))
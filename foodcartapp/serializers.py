@@ -1,16 +1,76 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.db import transaction
 from phonenumber_field.serializerfields import PhoneNumberField
+from geo.utils import enqueue_geocoding
+
+from .catalog import PRODUCT_FIELDS
+from .metrics import orders_created
 from .models import Order, OrderItem, Product
 
 
+ORDERS_BATCH_MAX_SIZE = 100
+
+
+class ProductListQuerySerializer(serializers.Serializer):
+    after = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=200, default=50)
+    category = serializers.IntegerField(min_value=1, required=False)
+    special_status = serializers.BooleanField(required=False)
+    fields = serializers.CharField(required=False)
+
+    def validate_fields(self, value):
+        fields = [field.strip() for field in value.split(',') if field.strip()]
+        unknown_fields = set(fields) - set(PRODUCT_FIELDS)
+        if unknown_fields:
+            raise serializers.ValidationError(
+                f"Неизвестные поля: {', '.join(sorted(unknown_fields))}. "
+                f"Доступны: {', '.join(PRODUCT_FIELDS)}."
+            )
+        return fields or None
+
+
 class OrderItemCreateSerializer(serializers.Serializer):
-    product = serializers.PrimaryKeyRelatedField(
-        queryset=Product.objects.all()
-    )
+    # Здесь только id: товары всей корзины достаёт одним запросом
+    # OrderCreateSerializer.validate_products.
+    product = serializers.IntegerField()
     quantity = serializers.IntegerField(min_value=1)
 
 
+def resolve_products(items, products=None, looked_up_ids=frozenset()):
+    """
+    Заменяет id товаров в позициях корзины на сами товары, загружая их
+    одним запросом.
+
+    products — уже загруженные товары {id: товар}, например общие для
+    пачки заказов, а looked_up_ids — id, которые при этом искали. Товаров
+    из looked_up_ids, которых нет в products, не существует, и повторно
+    они не ищутся. Загружаются только остальные.
+
+    Если каких-то товаров нет, выбрасывает ValidationError с ошибками
+    по каждой позиции — в том же формате, что и PrimaryKeyRelatedField.
+    """
+    products = dict(products or {})
+    missing_ids = {item['product'] for item in items} - products.keys() - looked_up_ids
+    if missing_ids:
+        products.update(Product.objects.in_bulk(missing_ids))
+
+    errors = []
+    for item in items:
+        if item['product'] in products:
+            errors.append({})
+            continue
+        message = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+        errors.append({'product': [message.format(pk_value=item['product'])]})
+    if any(errors):
+        raise serializers.ValidationError(errors)
+
+    return [
+        {**item, 'product': products[item['product']]}
+        for item in items
+    ]
+
+
 class OrderCreateSerializer(serializers.Serializer):
     firstname = serializers.CharField(max_length=50, allow_blank=False, trim_whitespace=True)
     lastname = serializers.CharField(max_length=50, allow_blank=False, trim_whitespace=True)
@@ -19,24 +79,122 @@ class OrderCreateSerializer(serializers.Serializer):
     products = OrderItemCreateSerializer(many=True, allow_empty=False)
     status = serializers.CharField(read_only=True)
 
+    def validate_products(self, items):
+        return resolve_products(
+            items,
+            self.context.get('products'),
+            self.context.get('looked_up_product_ids', frozenset()),
+        )
+
     @transaction.atomic
     def create(self, validated_data):
-        items_data = validated_data.pop('products')
+        order, order_items = build_order(validated_data)
+        order.save()
 
-        order = Order.objects.create(**validated_data)
-
-        OrderItem.objects.bulk_create([
-            OrderItem(
-                order=order,
-                product=item['product'],
-                quantity=item['quantity'],
-                price_snapshot=item['product'].price,
-            )
-            for item in items_data
-        ])
+        for item in order_items:
+            item.order = order
+        OrderItem.objects.bulk_create(order_items)
+        order.created_items = order_items
+        enqueue_geocoding([order.address])
+        # Считаем только заказы, которые действительно сохранились.
+        transaction.on_commit(lambda: orders_created.inc(source='order'))
         return order
 
 
+class OrderBatchCreateSerializer(serializers.Serializer):
+    """
+    Принимает пачку заказов от партнёров.
+
+    Каждый заказ проверяется отдельно, и ошибки одного не мешают остальным.
+    Товары всех заказов загружаются одним запросом, а корректные заказы
+    и их позиции создаются двумя bulk_create в одной транзакции.
+    """
+    orders = serializers.ListField(
+        child=serializers.JSONField(),
+        allow_empty=False,
+        max_length=getattr(settings, 'ORDERS_BATCH_MAX_SIZE', ORDERS_BATCH_MAX_SIZE),
+    )
+
+    def create(self, validated_data):
+        orders_data = validated_data['orders']
+        product_ids = collect_product_ids(orders_data)
+        products = Product.objects.in_bulk(product_ids)
+
+        context = {**self.context, 'products': products, 'looked_up_product_ids': product_ids}
+        order_serializers = [
+            OrderCreateSerializer(data=order_data, context=context)
+            for order_data in orders_data
+        ]
+        valid_serializers = [
+            order_serializer
+            for order_serializer in order_serializers
+            if order_serializer.is_valid()
+        ]
+
+        with transaction.atomic():
+            built_orders = [
+                build_order(order_serializer.validated_data)
+                for order_serializer in valid_serializers
+            ]
+            orders = Order.objects.bulk_create([order for order, _ in built_orders])
+
+            all_items = []
+            for order, order_items in built_orders:
+                for item in order_items:
+                    item.order = order
+                all_items.extend(order_items)
+                order.created_items = order_items
+            OrderItem.objects.bulk_create(all_items)
+            enqueue_geocoding([order.address for order in orders])
+            created_count = len(orders)
+            if created_count:
+                transaction.on_commit(lambda: orders_created.inc(created_count, source='batch'))
+
+        orders = iter(orders)
+        results = []
+        for index, order_serializer in enumerate(order_serializers):
+            if order_serializer.errors:
+                results.append({'index': index, 'created': False, 'errors': order_serializer.errors})
+            else:
+                order = next(orders)
+                results.append({'index': index, 'created': True, 'order': OrderReadSerializer(order).data})
+        return results
+
+
+def collect_product_ids(orders_data):
+    product_ids = set()
+    for order_data in orders_data:
+        if not isinstance(order_data, dict) or not isinstance(order_data.get('products'), list):
+            continue
+        for item in order_data['products']:
+            try:
+                product_ids.add(int(item['product']))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return product_ids
+
+
+def build_order(validated_data):
+    """Собирает несохранённый заказ и его позиции по проверенным данным."""
+    validated_data = dict(validated_data)
+    items_data = validated_data.pop('products')
+
+    order_items = [
+        OrderItem(
+            product=item['product'],
+            quantity=item['quantity'],
+            price_snapshot=item['product'].price,
+        )
+        for item in items_data
+    ]
+    order = Order(
+        **validated_data,
+        total_price=sum(item.quantity * item.price_snapshot for item in order_items),
+        items_count=sum(item.quantity for item in order_items),
+    )
+    return order, order_items
+
+
 class OrderItemReadSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
 
@@ -46,10 +204,18 @@ class OrderItemReadSerializer(serializers.ModelSerializer):
 
 
 class OrderReadSerializer(serializers.ModelSerializer):
-    items = OrderItemReadSerializer(many=True, read_only=True)
+    items = serializers.SerializerMethodField()
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     payment_method_display = serializers.CharField(source='get_payment_method_display', read_only=True)
 
     class Meta:
         model = Order
         fields = ('id', 'firstname', 'lastname', 'phonenumber', 'address', 'items', 'status', 'status_display', 'payment_method', 'payment_method_display')
+
+    def get_items(self, order):
+        # У только что созданного заказа позиции и их товары уже в памяти,
+        # перечитывать их из БД незачем.
+        items = getattr(order, 'created_items', None)
+        if items is None:
+            items = order.items.select_related('product')
+        return OrderItemReadSerializer(items, many=True).data
@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from geo import spatial
+
+from .availability import bump_menu_version
+from .banners import bump_banners_revision
+from .catalog import bump_catalog_revision
+from .models import Banner, Product, ProductCategory, Restaurant, RestaurantMenuItem
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def invalidate_availability_index(sender, **kwargs):
+    # Версию поднимаем после коммита, иначе индекс могут пересобрать
+    # по старым данным и сохранить уже под новой версией.
+    transaction.on_commit(bump_menu_version)
+
+
+@receiver(post_save, sender=Restaurant)
+def update_restaurant_location(sender, instance, **kwargs):
+    transaction.on_commit(lambda: spatial.update_restaurant_location(instance))
+
+
+@receiver(post_delete, sender=Restaurant)
+def remove_restaurant_location(sender, instance, **kwargs):
+    restaurant_id = instance.id
+    transaction.on_commit(lambda: spatial.remove_restaurant_location(restaurant_id))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def invalidate_catalog(sender, **kwargs):
+    transaction.on_commit(bump_catalog_revision)
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def invalidate_banners(sender, **kwargs):
+    transaction.on_commit(bump_banners_revision)
@@ -0,0 +1,174 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from .models import Order, OrderItem, Product, ProductCategory
+
+
+# Товары корзины одним запросом, заказ, его позиции одним INSERT,
+# постановка адреса в очередь геокодирования и точка сохранения транзакции.
+ORDER_CREATE_QUERIES = 7
+
+
+class OrderCreateQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        cls.products = Product.objects.bulk_create([
+            Product(
+                name=f'Бургер {number}',
+                category=category,
+                price=Decimal('100') + number,
+                image='burger.jpg',
+            )
+            for number in range(20)
+        ])
+
+    def create_order(self, items_count):
+        return self.client.post(
+            '/api/order/',
+            {
+                'firstname': 'Иван',
+                'lastname': 'Петров',
+                'phonenumber': '+79161234567',
+                'address': 'Москва, Тверская улица, 1',
+                'products': [
+                    {'product': product.id, 'quantity': 2}
+                    for product in self.products[:items_count]
+                ],
+            },
+            content_type='application/json',
+        )
+
+    def test_query_count_does_not_depend_on_basket_size(self):
+        for items_count in (1, 5, 20):
+            with self.subTest(items_count=items_count):
+                with self.assertNumQueries(ORDER_CREATE_QUERIES):
+                    response = self.create_order(items_count)
+
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(len(response.json()['items']), items_count)
+                self.assertEqual(
+                    [item['product_name'] for item in response.json()['items']],
+                    [product.name for product in self.products[:items_count]],
+                )
+
+        self.assertEqual(Order.objects.count(), 3)
+
+    def test_unknown_products_are_reported_per_line(self):
+        response = self.client.post(
+            '/api/order/',
+            {
+                'firstname': 'Иван',
+                'lastname': 'Петров',
+                'phonenumber': '+79161234567',
+                'address': 'Москва, Тверская улица, 1',
+                'products': [
+                    {'product': self.products[0].id, 'quantity': 1},
+                    {'product': 100500, 'quantity': 1},
+                ],
+            },
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['products']
+        self.assertEqual(errors[0], {})
+        self.assertIn('100500', errors[1]['product'][0])
+
+
+class OrderTotalsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Бургер {number}', category=category, price=Decimal('100'), image='burger.jpg')
+            for number in range(12)
+        ])
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def create_order(self, items_count):
+        order = Order.objects.create(
+            firstname='Иван',
+            lastname='Петров',
+            phonenumber='+79161234567',
+            address='Москва, Тверская улица, 1',
+            payment_method='CASH',
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price_snapshot=product.price)
+            for product in self.products[:items_count]
+        ])
+        return order
+
+    def test_order_delete_does_not_update_totals_per_item(self):
+        order = self.create_order(12)
+
+        # Позиции одним DELETE, отвязка ключей идемпотентности и сам заказ.
+        with self.assertNumQueries(3):
+            order.delete()
+
+    def test_admin_inline_updates_totals(self):
+        order = self.create_order(2)
+        items = list(order.items.all())
+        self.client.force_login(self.admin)
+
+        response = self.client.post(f'/admin/foodcartapp/order/{order.id}/change/', {
+            'firstname': order.firstname,
+            'lastname': order.lastname,
+            'phonenumber': order.phonenumber,
+            'address': order.address,
+            'status': order.status,
+            'comment': '',
+            'payment_method': order.payment_method,
+            'items-TOTAL_FORMS': 2,
+            'items-INITIAL_FORMS': 2,
+            'items-0-id': items[0].id,
+            'items-0-order': order.id,
+            'items-0-product': items[0].product_id,
+            'items-0-quantity': 3,
+            'items-0-price_snapshot': '100',
+            'items-1-id': items[1].id,
+            'items-1-order': order.id,
+            'items-1-product': items[1].product_id,
+            'items-1-quantity': 1,
+            'items-1-price_snapshot': '100',
+            'items-1-DELETE': 'on',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual((order.items_count, order.total_price), (3, Decimal('300')))
+
+
+class OrderBatchCreateQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        cls.product = Product.objects.create(
+            name='Бургер',
+            category=category,
+            price=Decimal('100'),
+            image='burger.jpg',
+        )
+
+    def test_unknown_products_are_not_looked_up_per_order(self):
+        orders = [
+            {
+                'firstname': 'Иван',
+                'lastname': 'Петров',
+                'phonenumber': '+79161234567',
+                'address': 'Москва, Тверская улица, 1',
+                'products': [{'product': 100500 + number, 'quantity': 1}],
+            }
+            for number in range(20)
+        ]
+
+        # Товары всей пачки одним запросом и точка сохранения пустой транзакции.
+        with self.assertNumQueries(3):
+            response = self.client.post('/api/orders/batch/', {'orders': orders}, content_type='application/json')
+
+        results = response.json()['results']
+        self.assertEqual([result['created'] for result in results], [False] * 20)
+        self.assertIn('100519', results[19]['errors']['products'][0]['product'][0])
@@ -1,11 +1,13 @@
 from django.urls import path
-from .views import product_list_api, banners_list_api
-from .views import OrderCreateView
+from .views import product_list_api, product_list_api_v2, banners_list_api
+from .views import OrderBatchCreateView, OrderCreateView
 
 app_name = "foodcartapp"
 
 urlpatterns = [
     path('products/', product_list_api),
+    path('v2/products/', product_list_api_v2),
     path('banners/', banners_list_api),
     path('order/', OrderCreateView.as_view()),
+    path('orders/batch/', OrderBatchCreateView.as_view()),
 ]
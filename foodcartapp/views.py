@@ -1,70 +1,218 @@
-from django.http import JsonResponse
-from django.templatetags.static import static
-from .models import Product
+from datetime import datetime, timezone
+import time
+
+from django.db import IntegrityError, transaction
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+from .banners import get_banners_feed, get_banners_revision
+from .catalog import (
+    dump_product,
+    get_catalog_payload,
+    get_catalog_payload_size,
+    get_catalog_revision,
+    get_products_page,
+)
+from .idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    get_idempotency_record,
+    get_request_fingerprint,
+    save_idempotency_record,
+)
+from .models import IdempotencyKey
+from .renderers import FastJsonResponse, FastJSONRenderer, choose_encoding, wants_pretty
 from rest_framework import generics, status
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
-from .serializers import OrderCreateSerializer, OrderReadSerializer
+from .serializers import (
+    OrderBatchCreateSerializer,
+    OrderCreateSerializer,
+    OrderReadSerializer,
+    ProductListQuerySerializer,
+)
+
+
+def get_request_banners_feed(request):
+    if not hasattr(request, 'banners_feed'):
+        request.banners_feed = get_banners_feed(get_banners_revision())
+    return request.banners_feed
+
+
+def get_banners_etag(request):
+    etag = get_request_banners_feed(request).etag
+    return f'{etag}-pretty' if wants_pretty(request) else etag
 
 
+@condition(etag_func=get_banners_etag)
 def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    feed = get_request_banners_feed(request)
+    payload = feed.pretty_payload if wants_pretty(request) else feed.payload
+    response = FastJsonResponse(body=payload)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def get_request_catalog_revision(request):
+    if not hasattr(request, 'catalog_revision'):
+        request.catalog_revision = get_catalog_revision()
+    return request.catalog_revision
+
+
+def get_request_catalog_variant(request):
+    """
+    Возвращает (pretty, encoding) ответа каталога.
+
+    Сжатие выбирается по запомненному размеру каталога, так что для
+    условного запроса БД не нужна. Если размер ещё неизвестен, возвращает
+    None: вариант выберет сам обработчик, когда соберёт каталог.
+    """
+    if not hasattr(request, 'catalog_variant'):
+        pretty = wants_pretty(request)
+        size = get_catalog_payload_size(get_request_catalog_revision(request), pretty=pretty)
+        request.catalog_variant = None if size is None else (pretty, choose_encoding(request, size))
+    return request.catalog_variant
+
+
+def format_catalog_etag(revision, pretty, encoding):
+    return f"{revision}-{'pretty' if pretty else 'compact'}-{encoding or 'identity'}"
+
+
+def get_catalog_etag(request):
+    variant = get_request_catalog_variant(request)
+    if variant is None:
+        return None
+    return format_catalog_etag(get_request_catalog_revision(request), *variant)
+
+
+def get_catalog_last_modified(request):
+    """
+    Возвращает дату изменения каталога с точностью до секунды.
+
+    Пока секунда последнего изменения не кончилась, даты нет: следующая
+    правка в ту же секунду получила бы ту же дату, и клиент с
+    If-Modified-Since получил бы устаревший 304. Точный валидатор — ETag.
+    """
+    modified_at = get_request_catalog_revision(request) // 10 ** 9
+    if time.time() < modified_at + 1:
+        return None
+    return datetime.fromtimestamp(modified_at, tz=timezone.utc)
 
 
+@condition(etag_func=get_catalog_etag, last_modified_func=get_catalog_last_modified)
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    revision = get_request_catalog_revision(request)
+    variant = get_request_catalog_variant(request)
+    if variant is None:
+        pretty = wants_pretty(request)
+        size = len(get_catalog_payload(revision, pretty=pretty))
+        variant = (pretty, choose_encoding(request, size))
+    pretty, encoding = variant
+
+    payload = get_catalog_payload(revision, pretty=pretty, encoding=encoding)
+    response = FastJsonResponse(body=payload, encoding=encoding)
+    response['ETag'] = quote_etag(format_catalog_etag(revision, pretty, encoding))
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@condition(last_modified_func=get_catalog_last_modified)
+def product_list_api_v2(request):
+    # Обычный dict, а не QueryDict: иначе DRF считает отсутствующий
+    # special_status равным False.
+    query_serializer = ProductListQuerySerializer(data=request.GET.dict())
+    if not query_serializer.is_valid():
+        return FastJsonResponse(query_serializer.errors, request=request, status=400)
+    query = query_serializer.validated_data
+
+    products, has_next = get_products_page(
+        after=query.get('after'),
+        limit=query['limit'],
+        category=query.get('category'),
+        special_status=query.get('special_status'),
+    )
+
+    results = [dump_product(product) for product in products]
+    if query.get('fields'):
+        results = [
+            {field: result[field] for field in query['fields']}
+            for result in results
+        ]
+
+    next_url = None
+    if has_next:
+        next_query = request.GET.copy()
+        next_query['after'] = products[-1].id
+        next_url = request.build_absolute_uri(f'{request.path}?{next_query.urlencode()}')
+
+    response = FastJsonResponse({'results': results, 'next': next_url}, request=request)
+    patch_cache_control(response, no_cache=True)
+    return response
 
 
 class OrderCreateView(generics.CreateAPIView):
+    """
+    Создаёт заказ.
+
+    Если клиент передал заголовок Idempotency-Key, повтор запроса с тем же
+    ключом не создаёт новый заказ, а возвращает сохранённый ответ первого.
+    """
     serializer_class = OrderCreateSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
     def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return self.create_order(request)[0]
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response(
+                {'detail': f'Заголовок {IDEMPOTENCY_KEY_HEADER} слишком длинный.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = get_request_fingerprint(request)
+        record = get_idempotency_record(key)
+        if record:
+            return self.replay(record, fingerprint)
+
+        try:
+            with transaction.atomic():
+                response, order = self.create_order(request)
+                save_idempotency_record(key, fingerprint, response, order=order)
+        except IntegrityError:
+            # Параллельный запрос с тем же ключом успел сохранить свой заказ.
+            record = get_idempotency_record(key)
+            if record is None:
+                raise
+            return self.replay(record, fingerprint)
+        return response
+
+    def create_order(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
 
         read_serializer = OrderReadSerializer(order)
-        return Response(read_serializer.data, status=status.HTTP_201_CREATED)
+        return Response(read_serializer.data, status=status.HTTP_201_CREATED), order
+
+    def replay(self, record, fingerprint):
+        if record.request_fingerprint != fingerprint:
+            return Response(
+                {'detail': f'{IDEMPOTENCY_KEY_HEADER} уже использован для другого заказа.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return Response(
+            record.response_body,
+            status=record.response_status,
+            headers={'Idempotent-Replayed': 'true'},
+        )
+
+
+class OrderBatchCreateView(generics.GenericAPIView):
+    serializer_class = OrderBatchCreateSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        return Response({'results': results}, status=status.HTTP_200_OK)
@@ -1,3 +1,39 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import GeocodedAddress, GeocodingJob
+from .utils import enqueue_geocoding
+
+
+@admin.register(GeocodedAddress)
+class GeocodedAddressAdmin(admin.ModelAdmin):
+    list_display = ['address', 'lat', 'lng', 'failure_reason', 'failures_count', 'retry_after', 'updated_at']
+    list_filter = ['failure_reason', 'provider']
+    search_fields = ['address']
+    readonly_fields = ['created_at', 'updated_at']
+    actions = ['clear_failures']
+
+    @admin.action(description='Сбросить неудачи и геокодировать заново')
+    def clear_failures(self, request, queryset):
+        failed = list(queryset.exclude(failure_reason='').values_list('address', 'normalized_address'))
+        addresses = [address for address, _ in failed]
+        cleared = queryset.filter(address__in=addresses).update(
+            failure_reason='',
+            failures_count=0,
+            retry_after=None,
+        )
+        # Задачи, оставшиеся от прошлых попыток, отложены до retry_after,
+        # а enqueue_geocoding существующие задачи не трогает.
+        GeocodingJob.objects.filter(normalized_address__in=[key for _, key in failed]).update(
+            next_attempt_at=timezone.now(),
+            attempts=0,
+        )
+        enqueue_geocoding(addresses)
+        self.message_user(request, f'Сброшено адресов: {cleared}')
+
+
+@admin.register(GeocodingJob)
+class GeocodingJobAdmin(admin.ModelAdmin):
+    list_display = ['address', 'attempts', 'next_attempt_at', 'last_error', 'created_at']
+    search_fields = ['address']
+    readonly_fields = ['created_at']
@@ -0,0 +1,116 @@
+from collections import OrderedDict, namedtuple
+import threading
+import time
+
+from django.conf import settings
+
+from .normalization import normalize_address
+
+
+GEOCODER_CACHE_SIZE = 10000
+GEOCODER_CACHE_TTL = 600
+
+CachedAddress = namedtuple('CachedAddress', ['id', 'lat', 'lng'])
+
+
+class CoordinatesCache:
+    """
+    LRU-кеш «адрес -> координаты» в памяти процесса.
+
+    Ключ — нормализованный адрес, поэтому разные написания одного адреса
+    попадают в одну запись.
+
+    Хранит только адреса с координатами. Записи живут не дольше ttl секунд:
+    сигналы GeocodedAddress чистят кеш только в своём процессе, а в остальных
+    устаревшие координаты пропадут по истечении ttl.
+    """
+
+    def __init__(self, maxsize=GEOCODER_CACHE_SIZE, ttl=GEOCODER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.warmed_up = False
+
+    def get_many(self, addresses):
+        """Возвращает словарь {адрес: CachedAddress} для найденных в кеше адресов."""
+        self.warm_up()
+        now = time.monotonic()
+        found = {}
+        with self.lock:
+            for address in addresses:
+                key = normalize_address(address)
+                entry = self.entries.get(key)
+                if entry is None or entry[0] < now:
+                    if entry is not None:
+                        del self.entries[key]
+                    self.misses += 1
+                    continue
+                self.entries.move_to_end(key)
+                found[address] = entry[1]
+                self.hits += 1
+        return found
+
+    def get(self, address):
+        return self.get_many([address]).get(address)
+
+    def set(self, address, geo):
+        if geo.lat is None or geo.lng is None:
+            return
+        key = normalize_address(address)
+        expires_at = time.monotonic() + self.ttl
+        with self.lock:
+            self.entries[key] = (expires_at, CachedAddress(geo.id, geo.lat, geo.lng))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def set_many(self, geos):
+        for geo in geos:
+            self.set(geo.address, geo)
+
+    def invalidate(self, address):
+        with self.lock:
+            self.entries.pop(normalize_address(address), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.warmed_up = False
+
+    def warm_up(self):
+        """При первом обращении загружает в кеш недавно обновлённые адреса."""
+        if self.warmed_up:
+            return
+        self.warmed_up = True
+
+        from .models import GeocodedAddress
+
+        geos = (
+            GeocodedAddress.objects
+            .filter(lat__isnull=False, lng__isnull=False)
+            .order_by('-updated_at')
+            .only('id', 'address', 'lat', 'lng')[:self.maxsize]
+        )
+        self.set_many(reversed(list(geos)))
+
+    def stats(self):
+        with self.lock:
+            requests_count = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / requests_count if requests_count else 0.0,
+            }
+
+
+coordinates_cache = CoordinatesCache(
+    maxsize=getattr(settings, 'GEOCODER_CACHE_SIZE', GEOCODER_CACHE_SIZE),
+    ttl=getattr(settings, 'GEOCODER_CACHE_TTL', GEOCODER_CACHE_TTL),
+)
@@ -0,0 +1,239 @@
+import threading
+import time
+
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+
+from star_burger.metrics import record_geocoder_time
+
+from .metrics import geocoder_requests
+from .models import GeocodedAddress
+
+
+YANDEX_GEOCODER_URL = "https://geocode-maps.yandex.ru/1.x"
+GEOCODER_TIMEOUT = 5
+GEOCODER_RATE_LIMIT = 10
+GEOCODER_POOL_SIZE = 16
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class GeocoderError(Exception):
+    def __init__(self, message, reason=None):
+        super().__init__(message)
+        self.reason = reason
+
+
+class GeocoderUnavailable(GeocoderError):
+    """Запрос не отправлялся: геокодер временно отключён после серии ошибок."""
+
+
+class TokenBucket:
+    """Ограничивает частоту запросов: не больше rate в секунду, пачкой до capacity."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Размыкается после failure_threshold ошибок подряд.
+
+    Пока цепь разомкнута, запросы не отправляются. Через cooldown секунд
+    пропускается один пробный запрос: если он успешен, цепь замыкается.
+    """
+
+    def __init__(self, failure_threshold, cooldown):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_in_progress or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.trial_in_progress = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_progress or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_progress = False
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+class YandexGeocoderClient:
+    """
+    Клиент Yandex Geocoder API.
+
+    Держит общую сессию с пулом keep-alive соединений, ограничивает частоту
+    запросов и перестаёт обращаться к Яндексу, пока тот сбоит.
+    """
+
+    def __init__(self, api_key, url=YANDEX_GEOCODER_URL, timeout=GEOCODER_TIMEOUT,
+                 rate_limit=GEOCODER_RATE_LIMIT, pool_size=GEOCODER_POOL_SIZE,
+                 failure_threshold=CIRCUIT_FAILURE_THRESHOLD, cooldown=CIRCUIT_COOLDOWN):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.rate_limiter = TokenBucket(rate_limit)
+        self.circuit_breaker = CircuitBreaker(failure_threshold, cooldown)
+
+        self.stats_lock = threading.Lock()
+        self.requests_count = 0
+        self.found_count = 0
+        self.not_found_count = 0
+        self.errors_count = 0
+        self.rejected_count = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def geocode(self, address):
+        """
+        Возвращает (lat, lng) или None, если Яндекс не нашёл адрес.
+
+        При ошибке выбрасывает GeocoderError с причиной из
+        GeocodedAddress.FAILURE_REASON_CHOICES, а если цепь разомкнута —
+        GeocoderUnavailable без причины.
+        """
+        if not self.circuit_breaker.allow_request():
+            with self.stats_lock:
+                self.rejected_count += 1
+            geocoder_requests.inc(result="rejected")
+            raise GeocoderUnavailable(f"Геокодер временно отключён, '{address}' не запрошен")
+
+        self.rate_limiter.acquire()
+        started_at = time.perf_counter()
+        try:
+            coords = self._request(address)
+        except GeocoderError:
+            self.circuit_breaker.record_failure()
+            self._record(started_at, errors=1)
+            raise
+
+        self.circuit_breaker.record_success()
+        if coords is None:
+            self._record(started_at, not_found=1)
+        else:
+            self._record(started_at, found=1)
+        return coords
+
+    def _request(self, address):
+        params = {
+            "apikey": self.api_key,
+            "geocode": address,
+            "format": "json",
+        }
+
+        try:
+            response = self.session.get(self.url, params=params, timeout=self.timeout)
+        except Exception as e:
+            raise GeocoderError(
+                f"Ошибка сети при запросе к Яндекс Геокодеру для '{address}': {e}",
+                GeocodedAddress.NETWORK_ERROR,
+            )
+
+        if response.status_code != 200:
+            raise GeocoderError(
+                f"Яндекс вернул статус {response.status_code} для '{address}': {response.text[:200]}",
+                GeocodedAddress.HTTP_ERROR,
+            )
+
+        try:
+            members = response.json()["response"]["GeoObjectCollection"]["featureMember"]
+            if not members:
+                return None
+
+            pos = members[0]["GeoObject"]["Point"]["pos"]
+            lon_str, lat_str = pos.split()
+            return float(lat_str), float(lon_str)
+        except Exception as e:
+            raise GeocoderError(
+                f"Ошибка разбора ответа Яндекса для '{address}': {e}",
+                GeocodedAddress.BAD_RESPONSE,
+            )
+
+    def _record(self, started_at, found=0, not_found=0, errors=0):
+        latency = time.perf_counter() - started_at
+        record_geocoder_time(latency)
+        geocoder_requests.inc(result="found" if found else "not_found" if not_found else "error")
+        with self.stats_lock:
+            self.requests_count += 1
+            self.found_count += found
+            self.not_found_count += not_found
+            self.errors_count += errors
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                "requests": self.requests_count,
+                "found": self.found_count,
+                "not_found": self.not_found_count,
+                "errors": self.errors_count,
+                "rejected": self.rejected_count,
+                "avg_latency": self.total_latency / self.requests_count if self.requests_count else 0.0,
+                "max_latency": self.max_latency,
+                "circuit_open": self.circuit_breaker.is_open,
+            }
+
+
+def get_geocoder_client():
+    """Возвращает общий для процесса клиент геокодера, настроенный из settings."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = YandexGeocoderClient(
+                    api_key=getattr(settings, "YANDEX_GEOCODER_API_KEY", None),
+                    url=getattr(settings, "YANDEX_GEOCODER_URL", YANDEX_GEOCODER_URL),
+                    rate_limit=getattr(settings, "GEOCODER_RATE_LIMIT", GEOCODER_RATE_LIMIT),
+                    pool_size=max(
+                        getattr(settings, "GEOCODER_MAX_WORKERS", GEOCODER_POOL_SIZE),
+                        GEOCODER_POOL_SIZE,
+                    ),
+                )
+    return _client
@@ -0,0 +1,144 @@
+import math
+
+import numpy as np
+from geopy.distance import geodesic
+
+
+HAVERSINE = 'haversine'
+GEODESIC = 'geodesic'
+DISTANCE_METHODS = (HAVERSINE, GEODESIC)
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(origin, destination):
+    """Расстояние в км между двумя точками (lat, lng) по формуле гаверсинусов."""
+    origin_lat, origin_lng = map(math.radians, origin)
+    destination_lat, destination_lng = map(math.radians, destination)
+    a = (
+        math.sin((destination_lat - origin_lat) / 2) ** 2
+        + math.cos(origin_lat) * math.cos(destination_lat)
+        * math.sin((destination_lng - origin_lng) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(max(a, 0), 1)))
+
+
+def haversine_matrix(origins, destinations):
+    """
+    Считает расстояния в км между всеми парами точек по формуле гаверсинусов.
+
+    origins и destinations — последовательности пар (lat, lng). Возвращает
+    массив формы (len(origins), len(destinations)).
+    """
+    origins = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    destinations = np.radians(np.asarray(destinations, dtype=float).reshape(-1, 2))
+
+    origin_lat = origins[:, 0][:, np.newaxis]
+    origin_lng = origins[:, 1][:, np.newaxis]
+    destination_lat = destinations[:, 0][np.newaxis, :]
+    destination_lng = destinations[:, 1][np.newaxis, :]
+
+    a = (
+        np.sin((destination_lat - origin_lat) / 2) ** 2
+        + np.cos(origin_lat) * np.cos(destination_lat)
+        * np.sin((destination_lng - origin_lng) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def geodesic_matrix(origins, destinations):
+    """То же, что haversine_matrix, но точно, на эллипсоиде WGS-84. Медленно."""
+    matrix = np.empty((len(origins), len(destinations)))
+    for row, origin in enumerate(origins):
+        for column, destination in enumerate(destinations):
+            matrix[row, column] = geodesic(origin, destination).km
+    return matrix
+
+
+def distance_matrix(origins, destinations, method=HAVERSINE):
+    if method == HAVERSINE:
+        return haversine_matrix(origins, destinations)
+    if method == GEODESIC:
+        return geodesic_matrix(origins, destinations)
+    raise ValueError(f'Неизвестный способ расчёта расстояний: {method}')
+
+
+def haversine_pairs(origins, destinations):
+    """
+    Считает расстояния в км между точками с одинаковыми номерами:
+    origins[i] — destinations[i]. Возвращает массив длины len(origins).
+    """
+    origins = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    destinations = np.radians(np.asarray(destinations, dtype=float).reshape(-1, 2))
+
+    a = (
+        np.sin((destinations[:, 0] - origins[:, 0]) / 2) ** 2
+        + np.cos(origins[:, 0]) * np.cos(destinations[:, 0])
+        * np.sin((destinations[:, 1] - origins[:, 1]) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def pair_distances(origins, destinations, method=HAVERSINE):
+    if method == HAVERSINE:
+        return haversine_pairs(origins, destinations)
+    if method == GEODESIC:
+        return np.array([
+            geodesic(origin, destination).km
+            for origin, destination in zip(origins, destinations)
+        ])
+    raise ValueError(f'Неизвестный способ расчёта расстояний: {method}')
+
+
+def get_distances(pairs, method=HAVERSINE):
+    """
+    Возвращает расстояния в км между парами геокодированных адресов.
+
+    pairs — пары (откуда, куда) объектов с полями id, lat и lng, например
+    GeocodedAddress или записи из geo.cache. Считаются и сохраняются только
+    эти пары, а не все сочетания адресов.
+    Результат — словарь {(origin_id, destination_id): км}. Уже посчитанные
+    расстояния читаются из таблицы AddressDistance одним запросом,
+    недостающие считаются одним вызовом NumPy и сохраняются одним bulk_create.
+    """
+    from .models import AddressDistance
+
+    pairs = {(origin.id, destination.id): (origin, destination) for origin, destination in pairs}
+    if not pairs:
+        return {}
+
+    stored = (
+        AddressDistance.objects
+        .filter(
+            origin_id__in={origin_id for origin_id, _ in pairs},
+            destination_id__in={destination_id for _, destination_id in pairs},
+        )
+        .values_list('origin_id', 'destination_id', 'distance_km')
+    )
+    distances = {
+        (origin_id, destination_id): distance_km
+        for origin_id, destination_id, distance_km in stored
+        if (origin_id, destination_id) in pairs
+    }
+
+    missing = [pair for key, pair in pairs.items() if key not in distances]
+    if not missing:
+        return distances
+
+    computed = pair_distances(
+        [(origin.lat, origin.lng) for origin, _ in missing],
+        [(destination.lat, destination.lng) for _, destination in missing],
+        method=method,
+    )
+
+    new_distances = []
+    for (origin, destination), distance_km in zip(missing, computed):
+        distances[(origin.id, destination.id)] = float(distance_km)
+        new_distances.append(AddressDistance(
+            origin_id=origin.id,
+            destination_id=destination.id,
+            distance_km=float(distance_km),
+        ))
+
+    AddressDistance.objects.bulk_create(new_distances, ignore_conflicts=True)
+    return distances
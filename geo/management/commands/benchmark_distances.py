@@ -0,0 +1,68 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from geopy.distance import geodesic
+
+from geo.distance import GEODESIC, HAVERSINE, distance_matrix
+
+
+MOSCOW_LAT, MOSCOW_LNG = 55.75, 37.62
+
+
+def random_points(rng, count):
+    return [
+        (MOSCOW_LAT + rng.uniform(-0.3, 0.3), MOSCOW_LNG + rng.uniform(-0.5, 0.5))
+        for _ in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает расчёт расстояний циклом geodesic и матрицей geo.distance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--restaurants', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--skip-geodesic',
+            action='store_true',
+            help='Не запускать медленные замеры на geodesic',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        orders = random_points(rng, options['orders'])
+        restaurants = random_points(rng, options['restaurants'])
+        pairs = len(orders) * len(restaurants)
+        self.stdout.write(f'{len(orders)} заказов × {len(restaurants)} ресторанов = {pairs} пар')
+
+        started_at = time.perf_counter()
+        haversine = distance_matrix(orders, restaurants, method=HAVERSINE)
+        self.report(HAVERSINE, time.perf_counter() - started_at, pairs)
+
+        if options['skip_geodesic']:
+            return
+
+        started_at = time.perf_counter()
+        loop = [
+            [round(geodesic(order, restaurant).km, 2) for restaurant in restaurants]
+            for order in orders
+        ]
+        self.report('цикл geodesic (как было)', time.perf_counter() - started_at, pairs)
+
+        started_at = time.perf_counter()
+        distance_matrix(orders, restaurants, method=GEODESIC)
+        self.report(GEODESIC, time.perf_counter() - started_at, pairs)
+
+        max_error = max(
+            abs(haversine[row, column] - loop[row][column])
+            for row in range(len(orders))
+            for column in range(len(restaurants))
+        )
+        self.stdout.write(f'Максимальное расхождение haversine с geodesic: {max_error:.3f} км')
+
+    def report(self, name, elapsed, pairs):
+        self.stdout.write(
+            f'{name}: {elapsed * 1000:.1f} мс, {elapsed / pairs * 1e6:.2f} мкс на пару'
+        )
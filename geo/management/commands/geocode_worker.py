@@ -0,0 +1,106 @@
+from datetime import timedelta
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from geo.models import GeocodedAddress, GeocodingJob
+from geo.utils import fetch_coordinates_batch
+
+
+LEASE = timedelta(minutes=5)
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+
+def get_retry_delay(attempts):
+    return min(RETRY_BASE_DELAY * 2 ** min(max(attempts - 1, 0), 16), RETRY_MAX_DELAY)
+
+
+def claim_jobs(batch_size):
+    """
+    Забирает пачку задач, у которых подошло время.
+
+    Задачи не удаляются, а откладываются на время LEASE: если воркер упадёт,
+    их подхватит следующий. Несколько воркеров не возьмут одни и те же задачи.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            GeocodingJob.objects
+            .due(now)
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        GeocodingJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + LEASE,
+        )
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def process_jobs(jobs):
+    """
+    Геокодирует адреса задач.
+
+    Задача закрывается, если адрес получил координаты или Яндекс его не нашёл.
+    Остальные откладываются до времени повтора, записанного в GeocodedAddress,
+    а если записи нет — по собственному расписанию очереди.
+    """
+    errors = {}
+    geocoded = fetch_coordinates_batch([job.address for job in jobs], errors=errors)
+
+    done_ids = []
+    failed_jobs = []
+    now = timezone.now()
+    for job in jobs:
+        geo = geocoded.get(job.address)
+        if geo and (geo.has_coords() or geo.failure_reason == GeocodedAddress.NOT_FOUND):
+            done_ids.append(job.id)
+            continue
+
+        if geo and geo.in_backoff(now):
+            job.next_attempt_at = geo.retry_after
+            job.last_error = errors.get(job.address, geo.get_failure_reason_display())
+        else:
+            job.next_attempt_at = now + get_retry_delay(job.attempts)
+            job.last_error = errors.get(job.address, 'Адрес не сохранён')
+        failed_jobs.append(job)
+
+    GeocodingJob.objects.filter(id__in=done_ids).delete()
+    GeocodingJob.objects.bulk_update(failed_jobs, ['last_error', 'next_attempt_at'])
+    return len(done_ids), len(failed_jobs)
+
+
+class Command(BaseCommand):
+    help = 'Разбирает очередь геокодирования адресов заказов и ресторанов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5,
+            help='Сколько секунд ждать, если очередь пуста',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь один раз и выйти',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            jobs = claim_jobs(options['batch_size'])
+            if jobs:
+                done, failed = process_jobs(jobs)
+                self.stdout.write(f'Геокодировано: {done}, отложено: {failed}')
+                continue
+
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Order, Restaurant
+from geo.models import GeocodedAddress
+from geo.normalization import normalize_address
+
+
+class Command(BaseCommand):
+    help = 'Показывает, насколько нормализация адресов увеличивает попадания в кеш геокодера'
+
+    def handle(self, *args, **options):
+        raw_addresses = set(GeocodedAddress.objects.values_list('address', flat=True))
+        normalized_addresses = set(GeocodedAddress.objects.values_list('normalized_address', flat=True))
+
+        lookups = [
+            address
+            for address in [
+                *Order.objects.values_list('address', flat=True),
+                *Restaurant.objects.values_list('address', flat=True),
+            ]
+            if address
+        ]
+        if not lookups:
+            self.stdout.write('Нет адресов заказов и ресторанов')
+            return
+
+        raw_hits = sum(1 for address in lookups if address in raw_addresses)
+        normalized_hits = sum(1 for address in lookups if normalize_address(address) in normalized_addresses)
+
+        distinct_raw = set(lookups)
+        distinct_normalized = {normalize_address(address) for address in distinct_raw}
+        raw_misses = {address for address in distinct_raw if address not in raw_addresses}
+        normalized_misses = {
+            normalize_address(address)
+            for address in raw_misses
+            if normalize_address(address) not in normalized_addresses
+        }
+
+        self.stdout.write(f'Записей в кеше геокодера: {len(raw_addresses)}')
+        self.stdout.write(f'Обращений к кешу (адреса заказов и ресторанов): {len(lookups)}')
+        self.stdout.write(f'Разных адресов: {len(distinct_raw)}, после нормализации: {len(distinct_normalized)}')
+        self.stdout.write(f'Попаданий по исходной строке: {raw_hits} ({raw_hits / len(lookups):.1%})')
+        self.stdout.write(f'Попаданий по нормализованному ключу: {normalized_hits} ({normalized_hits / len(lookups):.1%})')
+        self.stdout.write(
+            f'Запросов к геокодеру на промахи: {len(raw_misses)} по исходной строке, '
+            f'{len(normalized_misses)} по нормализованному ключу'
+        )
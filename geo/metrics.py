@@ -0,0 +1,57 @@
+from django.core.cache import cache
+
+from star_burger.metrics import Counter, FunctionMetric
+
+from .cache import coordinates_cache
+
+
+GEOCODING_JOBS_CACHE_KEY = 'geo:geocoding_jobs_count'
+GEOCODING_JOBS_CACHE_TTL = 60
+
+
+def get_coordinates_cache_requests():
+    stats = coordinates_cache.stats()
+    return {('hit',): stats['hits'], ('miss',): stats['misses']}
+
+
+def get_coordinates_cache_hit_ratio():
+    return {(): coordinates_cache.stats()['hit_ratio']}
+
+
+def get_geocoding_jobs():
+    # COUNT по очереди считается не чаще раза в минуту на все процессы,
+    # а не на каждый опрос каждого воркера.
+    from .models import GeocodingJob
+
+    count = cache.get_or_set(
+        GEOCODING_JOBS_CACHE_KEY,
+        GeocodingJob.objects.count,
+        timeout=GEOCODING_JOBS_CACHE_TTL,
+    )
+    return {(): count}
+
+
+geocoder_requests = Counter(
+    'star_burger_geocoder_requests_total',
+    'Запросы к геокодеру по результату: found, not_found, error, rejected',
+    labelnames=['result'],
+)
+coordinates_cache_requests = FunctionMetric(
+    'star_burger_coordinates_cache_requests_total',
+    'Обращения к кешу координат в памяти процесса',
+    'counter',
+    get_coordinates_cache_requests,
+    labelnames=['result'],
+)
+coordinates_cache_hit_ratio = FunctionMetric(
+    'star_burger_coordinates_cache_hit_ratio',
+    'Доля попаданий в кеш координат',
+    'gauge',
+    get_coordinates_cache_hit_ratio,
+)
+geocoding_jobs = FunctionMetric(
+    'star_burger_geocoding_jobs',
+    'Адресов в очереди геокодирования, обновляется раз в минуту',
+    'gauge',
+    get_geocoding_jobs,
+)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0004_rename_raw_address_geocodedaddress_address'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddressDistance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.FloatField(verbose_name='Расстояние, км')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distances_to', to='geo.geocodedaddress', verbose_name='Куда')),
+                ('origin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distances_from', to='geo.geocodedaddress', verbose_name='Откуда')),
+            ],
+            options={
+                'verbose_name': 'Расстояние между адресами',
+                'verbose_name_plural': 'Расстояния между адресами',
+                'unique_together': {('origin', 'destination')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0006_geocodingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geocodedaddress',
+            name='failure_reason',
+            field=models.CharField(blank=True, choices=[('NOT_FOUND', 'Адрес не найден'), ('HTTP_ERROR', 'Геокодер вернул ошибку'), ('NETWORK_ERROR', 'Ошибка сети'), ('BAD_RESPONSE', 'Непонятный ответ геокодера')], db_index=True, max_length=20, verbose_name='Причина неудачи'),
+        ),
+        migrations.AddField(
+            model_name='geocodedaddress',
+            name='failures_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Неудачных попыток подряд'),
+        ),
+        migrations.AddField(
+            model_name='geocodedaddress',
+            name='retry_after',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Повторить не раньше'),
+        ),
+    ]
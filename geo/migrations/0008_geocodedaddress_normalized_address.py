@@ -0,0 +1,106 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:10
+
+import re
+
+from django.db import migrations, models
+
+
+# Копия geo.normalization на момент миграции: если нормализация адресов
+# потом поменяется, миграция должна заполнять ключи так же, как раньше.
+ABBREVIATIONS = {
+    'г': 'город',
+    'гор': 'город',
+    'ул': 'улица',
+    'пр': 'проспект',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'наб': 'набережная',
+    'ш': 'шоссе',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'туп': 'тупик',
+    'мкр': 'микрорайон',
+    'мкр-н': 'микрорайон',
+    'р-н': 'район',
+    'обл': 'область',
+    'пос': 'поселок',
+    'д': 'дом',
+    'к': 'корпус',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+    'эт': 'этаж',
+    'под': 'подъезд',
+}
+OPTIONAL_WORDS = {'город', 'улица', 'дом'}
+PUNCTUATION_RE = re.compile(r'[^\w\s/-]+')
+SPACES_RE = re.compile(r'\s+')
+
+
+def normalize_address(address):
+    address = address.lower().replace('ё', 'е')
+    address = PUNCTUATION_RE.sub(' ', address)
+
+    words = []
+    for word in SPACES_RE.split(address):
+        word = word.strip('-/')
+        if not word:
+            continue
+        word = ABBREVIATIONS.get(word, word)
+        if word in OPTIONAL_WORDS:
+            continue
+        words.append(word)
+
+    return ' '.join(words)[:255]
+
+
+def backfill_normalized_addresses(apps, schema_editor):
+    """
+    Заполняет нормализованные адреса и склеивает дубли.
+
+    Из записей с одинаковым ключом остаётся одна: с координатами,
+    а среди них — обновлённая последней.
+    """
+    GeocodedAddress = apps.get_model('geo', 'GeocodedAddress')
+
+    by_key = {}
+    for geo in GeocodedAddress.objects.order_by('id'):
+        by_key.setdefault(normalize_address(geo.address), []).append(geo)
+
+    duplicate_ids = []
+    to_update = []
+    for key, geos in by_key.items():
+        geos.sort(
+            key=lambda geo: (geo.lat is not None and geo.lng is not None, geo.updated_at),
+            reverse=True,
+        )
+        kept, *duplicates = geos
+        kept.normalized_address = key
+        to_update.append(kept)
+        duplicate_ids.extend(geo.id for geo in duplicates)
+
+    GeocodedAddress.objects.filter(id__in=duplicate_ids).delete()
+    GeocodedAddress.objects.bulk_update(to_update, ['normalized_address'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0007_geocodedaddress_failures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geocodedaddress',
+            name='normalized_address',
+            field=models.CharField(editable=False, max_length=255, null=True, verbose_name='Нормализованный адрес'),
+        ),
+        migrations.RunPython(backfill_normalized_addresses, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='geocodedaddress',
+            name='normalized_address',
+            field=models.CharField(editable=False, max_length=255, unique=True, verbose_name='Нормализованный адрес'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:40
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+# Ключи задач считаются той же замороженной нормализацией, что и ключи
+# GeocodedAddress в 0008, иначе воркер не найдёт записи по своим задачам.
+normalize_address = import_module('geo.migrations.0008_geocodedaddress_normalized_address').normalize_address
+
+
+def backfill_normalized_addresses(apps, schema_editor):
+    """
+    Заполняет нормализованные адреса задач и склеивает дубли.
+
+    Из задач с одинаковым ключом остаётся та, что подойдёт раньше.
+    """
+    GeocodingJob = apps.get_model('geo', 'GeocodingJob')
+
+    seen_keys = set()
+    duplicate_ids = []
+    to_update = []
+    for job in GeocodingJob.objects.order_by('next_attempt_at', 'id'):
+        key = normalize_address(job.address)
+        if key in seen_keys:
+            duplicate_ids.append(job.id)
+            continue
+        seen_keys.add(key)
+        job.normalized_address = key
+        to_update.append(job)
+
+    GeocodingJob.objects.filter(id__in=duplicate_ids).delete()
+    GeocodingJob.objects.bulk_update(to_update, ['normalized_address'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0008_geocodedaddress_normalized_address'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geocodingjob',
+            name='normalized_address',
+            field=models.CharField(editable=False, max_length=255, null=True, verbose_name='Нормализованный адрес'),
+        ),
+        migrations.RunPython(backfill_normalized_addresses, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='geocodingjob',
+            name='normalized_address',
+            field=models.CharField(editable=False, max_length=255, unique=True, verbose_name='Нормализованный адрес'),
+        ),
+        migrations.AlterField(
+            model_name='geocodingjob',
+            name='address',
+            field=models.CharField(max_length=255, verbose_name='Адрес'),
+        ),
+    ]
@@ -1,12 +1,43 @@
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
+
+from .normalization import NORMALIZED_ADDRESS_MAX_LENGTH, normalize_address
+
+
+class GeocodedAddressQuerySet(models.QuerySet):
+    def in_backoff(self, now=None):
+        return self.filter(retry_after__gt=now or timezone.now())
 
 
 class GeocodedAddress(models.Model):
+    NOT_FOUND = 'NOT_FOUND'
+    HTTP_ERROR = 'HTTP_ERROR'
+    NETWORK_ERROR = 'NETWORK_ERROR'
+    BAD_RESPONSE = 'BAD_RESPONSE'
+    FAILURE_REASON_CHOICES = [
+        (NOT_FOUND, 'Адрес не найден'),
+        (HTTP_ERROR, 'Геокодер вернул ошибку'),
+        (NETWORK_ERROR, 'Ошибка сети'),
+        (BAD_RESPONSE, 'Непонятный ответ геокодера'),
+    ]
+    RETRY_BASE_DELAY = timedelta(minutes=5)
+    NOT_FOUND_RETRY_BASE_DELAY = timedelta(days=1)
+    RETRY_MAX_DELAY = timedelta(days=30)
+
     address = models.CharField(
         'Исходный адрес',
         max_length=255,
         unique=True,
     )
+    normalized_address = models.CharField(
+        'Нормализованный адрес',
+        max_length=NORMALIZED_ADDRESS_MAX_LENGTH,
+        unique=True,
+        editable=False,
+    )
     lat = models.FloatField('Широта', null=True, blank=True)
     lng = models.FloatField('Долгота', null=True, blank=True)
     provider = models.CharField(
@@ -14,12 +45,150 @@ class GeocodedAddress(models.Model):
         max_length=50,
         default='yandex',
     )
+    failure_reason = models.CharField(
+        'Причина неудачи',
+        max_length=20,
+        choices=FAILURE_REASON_CHOICES,
+        blank=True,
+        db_index=True,
+    )
+    failures_count = models.PositiveIntegerField('Неудачных попыток подряд', default=0)
+    retry_after = models.DateTimeField(
+        'Повторить не раньше',
+        null=True,
+        blank=True,
+        db_index=True,
+    )
     created_at = models.DateTimeField('Создано', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлено', auto_now=True)
 
+    objects = GeocodedAddressQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Геокодированный адрес'
         verbose_name_plural = 'Геокодированные адреса'
 
     def __str__(self):
         return self.address
+
+    def clean(self):
+        # normalized_address в формы не попадает, поэтому его уникальность
+        # Django сам не проверит и упадёт с IntegrityError при сохранении.
+        normalized_address = normalize_address(self.address)
+        duplicate = (
+            GeocodedAddress.objects
+            .filter(normalized_address=normalized_address)
+            .exclude(pk=self.pk)
+            .first()
+        )
+        if duplicate:
+            raise ValidationError({'address': f'Этот адрес уже есть в базе как «{duplicate.address}»'})
+
+    def save(self, *args, **kwargs):
+        self.normalized_address = normalize_address(self.address)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_coords = (instance.__dict__.get('lat'), instance.__dict__.get('lng'))
+        return instance
+
+    def has_coords(self):
+        return self.lat is not None and self.lng is not None
+
+    def in_backoff(self, now=None):
+        return self.retry_after is not None and self.retry_after > (now or timezone.now())
+
+    def record_success(self, lat, lng):
+        self.lat, self.lng = lat, lng
+        self.failure_reason = ''
+        self.failures_count = 0
+        self.retry_after = None
+
+    def record_failure(self, reason, now=None):
+        """Запоминает неудачу и откладывает следующую попытку, каждый раз вдвое дальше."""
+        if reason == self.NOT_FOUND:
+            self.lat, self.lng = None, None
+        base_delay = self.NOT_FOUND_RETRY_BASE_DELAY if reason == self.NOT_FOUND else self.RETRY_BASE_DELAY
+        self.failure_reason = reason
+        self.failures_count += 1
+        delay = min(base_delay * 2 ** min(self.failures_count - 1, 16), self.RETRY_MAX_DELAY)
+        self.retry_after = (now or timezone.now()) + delay
+
+    def coords_changed(self):
+        loaded_coords = getattr(self, '_loaded_coords', None)
+        return loaded_coords is not None and loaded_coords != (self.lat, self.lng)
+
+
+class AddressDistanceQuerySet(models.QuerySet):
+    def involving(self, address_ids):
+        return self.filter(
+            models.Q(origin_id__in=address_ids) | models.Q(destination_id__in=address_ids)
+        )
+
+
+class AddressDistance(models.Model):
+    origin = models.ForeignKey(
+        GeocodedAddress,
+        verbose_name='Откуда',
+        on_delete=models.CASCADE,
+        related_name='distances_from',
+    )
+    destination = models.ForeignKey(
+        GeocodedAddress,
+        verbose_name='Куда',
+        on_delete=models.CASCADE,
+        related_name='distances_to',
+    )
+    distance_km = models.FloatField('Расстояние, км')
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+
+    objects = AddressDistanceQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Расстояние между адресами'
+        verbose_name_plural = 'Расстояния между адресами'
+        unique_together = [
+            ['origin', 'destination']
+        ]
+
+    def __str__(self):
+        return f'{self.origin} -> {self.destination}: {self.distance_km} км'
+
+
+class GeocodingJobQuerySet(models.QuerySet):
+    def due(self, now=None):
+        return self.filter(next_attempt_at__lte=now or timezone.now())
+
+
+class GeocodingJob(models.Model):
+    address = models.CharField('Адрес', max_length=255)
+    normalized_address = models.CharField(
+        'Нормализованный адрес',
+        max_length=NORMALIZED_ADDRESS_MAX_LENGTH,
+        unique=True,
+        editable=False,
+    )
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+        db_index=True,
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+
+    objects = GeocodingJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Задача геокодирования'
+        verbose_name_plural = 'Задачи геокодирования'
+        ordering = ['next_attempt_at', 'id']
+
+    def __str__(self):
+        return self.address
+
+    def save(self, *args, **kwargs):
+        self.normalized_address = normalize_address(self.address)
+        super().save(*args, **kwargs)
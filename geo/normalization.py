@@ -0,0 +1,64 @@
+from functools import lru_cache
+import re
+
+
+NORMALIZED_ADDRESS_MAX_LENGTH = 255
+
+ABBREVIATIONS = {
+    'г': 'город',
+    'гор': 'город',
+    'ул': 'улица',
+    'пр': 'проспект',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'наб': 'набережная',
+    'ш': 'шоссе',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'туп': 'тупик',
+    'мкр': 'микрорайон',
+    'мкр-н': 'микрорайон',
+    'р-н': 'район',
+    'обл': 'область',
+    'пос': 'поселок',
+    'д': 'дом',
+    'к': 'корпус',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+    'эт': 'этаж',
+    'под': 'подъезд',
+}
+
+# Слова, которые в адресах то пишут, то опускают. В ключ они не попадают,
+# чтобы «Москва, ул. Тверская, д. 1» и «Москва, Тверская 1» совпали.
+OPTIONAL_WORDS = {'город', 'улица', 'дом'}
+
+PUNCTUATION_RE = re.compile(r'[^\w\s/-]+')
+SPACES_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=10000)
+def normalize_address(address):
+    """
+    Приводит адрес к каноническому ключу для поиска в кеше геокодера.
+
+    Регистр, ё/е, пунктуация, лишние пробелы и сокращения вроде «ул.»
+    на ключ не влияют.
+    """
+    address = address.lower().replace('ё', 'е')
+    address = PUNCTUATION_RE.sub(' ', address)
+
+    words = []
+    for word in SPACES_RE.split(address):
+        word = word.strip('-/')
+        if not word:
+            continue
+        word = ABBREVIATIONS.get(word, word)
+        if word in OPTIONAL_WORDS:
+            continue
+        words.append(word)
+
+    return ' '.join(words)[:NORMALIZED_ADDRESS_MAX_LENGTH]
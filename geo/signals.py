@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import coordinates_cache
+from .models import AddressDistance, GeocodedAddress
+
+
+@receiver(post_save, sender=GeocodedAddress)
+def invalidate_distances(sender, instance, created, **kwargs):
+    if created or not instance.coords_changed():
+        return
+
+    AddressDistance.objects.involving([instance.id]).delete()
+    instance._loaded_coords = (instance.lat, instance.lng)
+
+
+@receiver(post_save, sender=GeocodedAddress)
+@receiver(post_delete, sender=GeocodedAddress)
+def invalidate_coordinates_cache(sender, instance, **kwargs):
+    coordinates_cache.invalidate(instance.address)
@@ -0,0 +1,248 @@
+from collections import Counter
+import heapq
+import math
+import threading
+
+from .distance import haversine_km
+from .normalization import normalize_address
+
+
+KM_PER_DEGREE = 111.195
+SPATIAL_INDEX_CELL_KM = 2.0
+
+_restaurant_index = None
+_restaurant_index_lock = threading.Lock()
+
+
+class SpatialIndex:
+    """
+    Сетка над точками (lat, lng) для поиска ближайших.
+
+    Точки раскладываются по ячейкам размером cell_km градусов по широте
+    и долготе. Поиск обходит кольца ячеек вокруг точки запроса и
+    останавливается, когда ближе найденного в следующих кольцах быть
+    ничего не может. Точки можно добавлять, двигать и удалять по одной,
+    без перестройки всей сетки.
+    """
+
+    def __init__(self, cell_km=SPATIAL_INDEX_CELL_KM):
+        self.cell_degrees = cell_km / KM_PER_DEGREE
+        self.points = {}
+        self.cells = {}
+        # Сколько занятых ячеек в каждой строке и каждом столбце сетки.
+        # По ним без обхода всех точек известны границы занятой области.
+        self.rows = Counter()
+        self.columns = Counter()
+        self._bounds = None
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, point_id):
+        return point_id in self.points
+
+    def cell_of(self, lat, lng):
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def update(self, point_id, lat, lng):
+        with self.lock:
+            if self.points.get(point_id) == (lat, lng):
+                return
+            self.remove(point_id)
+            self.points[point_id] = (lat, lng)
+            cell = self.cell_of(lat, lng)
+            if cell not in self.cells:
+                self.cells[cell] = set()
+                self._count_cell(cell, 1)
+            self.cells[cell].add(point_id)
+
+    def remove(self, point_id):
+        with self.lock:
+            coords = self.points.pop(point_id, None)
+            if coords is None:
+                return
+            cell = self.cell_of(*coords)
+            self.cells[cell].discard(point_id)
+            if not self.cells[cell]:
+                del self.cells[cell]
+                self._count_cell(cell, -1)
+
+    def _count_cell(self, cell, delta):
+        row, column = cell
+        for counter, key in ((self.rows, row), (self.columns, column)):
+            counter[key] += delta
+            if counter[key] == 0:
+                del counter[key]
+            if counter[key] in (0, 1):
+                # Строка или столбец появились или опустели: границы могли сдвинуться.
+                self._bounds = None
+
+    def bounds(self):
+        """Возвращает (min_row, max_row, min_column, max_column) занятых ячеек."""
+        if self._bounds is None:
+            self._bounds = (min(self.rows), max(self.rows), min(self.columns), max(self.columns))
+        return self._bounds
+
+    def nearest(self, lat, lng, k=None, radius_km=None, point_ids=None):
+        """
+        Возвращает до k ближайших точек не дальше radius_km от (lat, lng).
+
+        Результат — список пар (id, расстояние в км) по возрастанию расстояния.
+        Если передан point_ids, рассматриваются только точки из него.
+        """
+        if k is not None and k <= 0:
+            return []
+
+        with self.lock:
+            if point_ids is not None and len(point_ids) < len(self.points) // 4:
+                # Кандидатов мало, их дешевле проверить напрямую.
+                candidates = (
+                    (point_id, self.points[point_id])
+                    for point_id in point_ids
+                    if point_id in self.points
+                )
+                return self._select(lat, lng, candidates, k, radius_km)
+
+            if not self.cells:
+                return []
+
+            row, column = self.cell_of(lat, lng)
+            min_row, max_row, min_column, max_column = self.bounds()
+            max_ring = max(
+                abs(row - min_row), abs(row - max_row),
+                abs(column - min_column), abs(column - max_column),
+            )
+            # Широта любой точки не дальше от экватора, чем край её строки сетки.
+            max_abs_lat = max(
+                abs(lat),
+                abs(min_row * self.cell_degrees),
+                abs((max_row + 1) * self.cell_degrees),
+            )
+            ring_km = self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(min(max_abs_lat, 89)))
+
+            found = []
+            for ring in range(max_ring + 1):
+                # Точки в этом и дальних кольцах не ближе, чем min_distance.
+                min_distance = (ring - 1) * ring_km
+                if radius_km is not None and min_distance > radius_km:
+                    break
+                if k is not None and len(found) >= k and min_distance > found[k - 1][1]:
+                    break
+
+                if 8 * ring > len(self.cells):
+                    # Кольцо уже больше, чем занятых ячеек: дешевле разом
+                    # проверить все оставшиеся, чем обходить пустые кольца
+                    # до далёких точек.
+                    candidates = [
+                        (point_id, self.points[point_id])
+                        for (cell_row, cell_column), cell_points in self.cells.items()
+                        if max(abs(cell_row - row), abs(cell_column - column)) >= ring
+                        for point_id in cell_points
+                        if point_ids is None or point_id in point_ids
+                    ]
+                    found = self._select(lat, lng, candidates, None, radius_km, found)
+                    break
+
+                candidates = []
+                for cell in self._ring_cells(row, column, ring):
+                    for point_id in self.cells.get(cell, ()):
+                        if point_ids is None or point_id in point_ids:
+                            candidates.append((point_id, self.points[point_id]))
+                found = self._select(lat, lng, candidates, None, radius_km, found)
+
+            return found[:k] if k is not None else found
+
+    def _ring_cells(self, row, column, ring):
+        if ring == 0:
+            yield row, column
+            return
+        for offset in range(-ring, ring + 1):
+            yield row - ring, column + offset
+            yield row + ring, column + offset
+        for offset in range(-ring + 1, ring):
+            yield row + offset, column - ring
+            yield row + offset, column + ring
+
+    def _select(self, lat, lng, candidates, k, radius_km, found=()):
+        found = list(found)
+        for point_id, coords in candidates:
+            distance_km = haversine_km((lat, lng), coords)
+            if radius_km is None or distance_km <= radius_km:
+                found.append((point_id, distance_km))
+        if k is not None:
+            return heapq.nsmallest(k, found, key=lambda item: item[1])
+        return sorted(found, key=lambda item: item[1])
+
+
+def get_restaurant_spatial_index():
+    """
+    Возвращает общий для процесса индекс ресторанов по координатам.
+
+    При первом вызове индекс строится по всем ресторанам с известными
+    координатами, дальше поддерживается точечными обновлениями.
+    """
+    global _restaurant_index
+    if _restaurant_index is not None:
+        return _restaurant_index
+
+    with _restaurant_index_lock:
+        if _restaurant_index is None:
+            from foodcartapp.models import Restaurant
+
+            index = SpatialIndex()
+            restaurants = list(Restaurant.objects.exclude(address='').only('id', 'address'))
+            coords = _get_coords({restaurant.address for restaurant in restaurants})
+            for restaurant in restaurants:
+                if restaurant.address in coords:
+                    index.update(restaurant.id, *coords[restaurant.address])
+            _restaurant_index = index
+    return _restaurant_index
+
+
+def reset_restaurant_spatial_index():
+    """Сбрасывает индекс: он заново построится по БД при следующем обращении."""
+    global _restaurant_index
+    with _restaurant_index_lock:
+        _restaurant_index = None
+
+
+def update_restaurant_location(restaurant):
+    """Переносит ресторан в индексе на координаты его текущего адреса."""
+    if _restaurant_index is None:
+        return
+
+    coords = _get_coords({restaurant.address}).get(restaurant.address)
+    if coords:
+        _restaurant_index.update(restaurant.id, *coords)
+    else:
+        _restaurant_index.remove(restaurant.id)
+
+
+def remove_restaurant_location(restaurant_id):
+    if _restaurant_index is not None:
+        _restaurant_index.remove(restaurant_id)
+
+
+def _get_coords(addresses):
+    from .cache import coordinates_cache
+    from .models import GeocodedAddress
+
+    addresses = {address for address in addresses if address}
+    coords = {
+        address: (geo.lat, geo.lng)
+        for address, geo in coordinates_cache.get_many(addresses).items()
+    }
+    keys = {address: normalize_address(address) for address in addresses - coords.keys()}
+    geocoded = {
+        geo.normalized_address: geo
+        for geo in GeocodedAddress.objects.filter(
+            normalized_address__in=set(keys.values()),
+            lat__isnull=False,
+            lng__isnull=False,
+        )
+    }
+    for address, key in keys.items():
+        if key in geocoded:
+            coords[address] = (geocoded[key].lat, geocoded[key].lng)
+    return coords
@@ -1,3 +1,143 @@
-from django.test import TestCase
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+
+from geo import client as geocoder_client
+from geo.cache import coordinates_cache
+from geo.management.commands.geocode_worker import claim_jobs, process_jobs
+from geo.models import GeocodedAddress, GeocodingJob
+from geo.utils import enqueue_geocoding, fetch_coordinates_batch
+
+
+FOUND_ADDRESS = 'Москва, Тверская улица, 1'
+NOT_FOUND_ADDRESS = 'Нигде, несуществующая улица'
+BROKEN_ADDRESS = 'Москва, улица Сбоев, 500'
+
+
+class FakeGeocoderHandler(BaseHTTPRequestHandler):
+    """Отвечает как Yandex Geocoder API: координаты, пустой ответ или 500."""
+
+    def do_GET(self):
+        address = parse_qs(urlparse(self.path).query)['geocode'][0]
+        self.server.requested.append(address)
+
+        if address == BROKEN_ADDRESS:
+            self.send_response(500)
+            self.end_headers()
+            self.wfile.write(b'Internal Server Error')
+            return
+
+        members = []
+        if address != NOT_FOUND_ADDRESS:
+            members = [{'GeoObject': {'Point': {'pos': '37.611347 55.757718'}}}]
+        body = json.dumps({'response': {'GeoObjectCollection': {'featureMember': members}}}).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeGeocoderTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGeocoderHandler)
+        cls.server.requested = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+        host, port = cls.server.server_address
+        cls.settings_override = override_settings(
+            YANDEX_GEOCODER_URL=f'http://{host}:{port}/1.x',
+            YANDEX_GEOCODER_API_KEY='test-key',
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requested.clear()
+        coordinates_cache.clear()
+        # Клиент геокодера создаётся один раз на процесс, а тестам нужен
+        # свежий: с адресом фейкового сервера и замкнутой цепью.
+        client_patcher = mock.patch.object(geocoder_client, '_client', None)
+        client_patcher.start()
+        self.addCleanup(client_patcher.stop)
+
+
+class FetchCoordinatesBatchTest(FakeGeocoderTestCase):
+    def test_found_address_is_saved_with_coordinates(self):
+        geocoded = fetch_coordinates_batch([FOUND_ADDRESS])
+
+        geo = GeocodedAddress.objects.get(address=FOUND_ADDRESS)
+        self.assertEqual((geo.lat, geo.lng), (55.757718, 37.611347))
+        self.assertEqual(geocoded[FOUND_ADDRESS].id, geo.id)
+        self.assertEqual(self.server.requested, [FOUND_ADDRESS])
+
+    def test_not_found_address_is_saved_without_coordinates(self):
+        errors = {}
+        fetch_coordinates_batch([NOT_FOUND_ADDRESS], errors=errors)
+
+        geo = GeocodedAddress.objects.get(address=NOT_FOUND_ADDRESS)
+        self.assertFalse(geo.has_coords())
+        self.assertEqual(geo.failure_reason, GeocodedAddress.NOT_FOUND)
+        self.assertEqual(errors, {})
+
+    def test_server_error_is_recorded_for_retry(self):
+        errors = {}
+        fetch_coordinates_batch([BROKEN_ADDRESS], errors=errors)
+
+        geo = GeocodedAddress.objects.get(address=BROKEN_ADDRESS)
+        self.assertFalse(geo.has_coords())
+        self.assertEqual(geo.failure_reason, GeocodedAddress.HTTP_ERROR)
+        self.assertTrue(geo.in_backoff())
+        self.assertIn('500', errors[BROKEN_ADDRESS])
+
+    def test_addresses_in_backoff_are_not_requested_again(self):
+        fetch_coordinates_batch([BROKEN_ADDRESS])
+        fetch_coordinates_batch([BROKEN_ADDRESS, FOUND_ADDRESS])
+
+        self.assertEqual(self.server.requested, [BROKEN_ADDRESS, FOUND_ADDRESS])
+
+
+class GeocodeWorkerTest(FakeGeocoderTestCase):
+    def test_worker_closes_finished_jobs_and_defers_failed(self):
+        enqueue_geocoding([FOUND_ADDRESS, NOT_FOUND_ADDRESS, BROKEN_ADDRESS])
+
+        done, failed = process_jobs(claim_jobs(batch_size=10))
+
+        self.assertEqual((done, failed), (2, 1))
+        job = GeocodingJob.objects.get()
+        self.assertEqual(job.address, BROKEN_ADDRESS)
+        self.assertIn('500', job.last_error)
+        self.assertEqual(claim_jobs(batch_size=10), [])
+
+
+class NormalizedAddressTest(TestCase):
+    def test_address_variants_share_one_job(self):
+        enqueue_geocoding(['Москва, ул. Тверская, д. 1', 'москва  тверская 1', FOUND_ADDRESS])
+
+        self.assertEqual(GeocodingJob.objects.count(), 1)
+
+    def test_address_colliding_with_another_record_is_a_validation_error(self):
+        GeocodedAddress.objects.create(address=FOUND_ADDRESS)
+        geo = GeocodedAddress.objects.create(address=NOT_FOUND_ADDRESS)
+
+        geo.address = 'Москва, ул. Тверская, д. 1'
+        with self.assertRaises(ValidationError) as error:
+            geo.full_clean()
+        self.assertIn('address', error.exception.message_dict)
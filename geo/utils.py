@@ -1,73 +1,230 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
 from django.conf import settings
-import requests
+from django.db.models import Q
+from django.utils import timezone
 
-from .models import GeocodedAddress
+from .cache import coordinates_cache
+from .client import GeocoderError, GeocoderUnavailable, get_geocoder_client
+from .models import GeocodedAddress, GeocodingJob
+from .normalization import normalize_address
 
 
-YANDEX_GEOCODER_URL = "https://geocode-maps.yandex.ru/1.x"
+GEOCODER_MAX_WORKERS = 8
 
 
 def fetch_coordinates(address: str):
     """
-    Возвращает объект GeocodedAddress для адреса.
+    Возвращает координаты адреса: объект с полями id, lat и lng.
 
-    1) Сначала ищет в таблице GeocodedAddress.
-    2) Если нет, обращается к Yandex Geocoder API, сохраняет ответ в БД и возвращает координаты.
-    3) Если не удалось найти, возвращает None.
+    1) Сначала ищет в кеше процесса, затем в таблице GeocodedAddress.
+       Из кеша возвращается geo.cache.CachedAddress, а не модель: сохранять
+       его нечего, запись в БД уже есть.
+    2) Если прошлая попытка не удалась и время повтора не подошло, Яндекс не спрашивает.
+    3) Иначе обращается к Yandex Geocoder API и сохраняет в БД координаты или причину неудачи.
+    4) Если не удалось найти, возвращает запись без координат или None.
     """
     if not address:
         print("Пустой адрес")
         return None
 
-    cached = GeocodedAddress.objects.filter(address=address).first()
-    if cached and cached.lat is not None and cached.lng is not None:
+    cached_coords = coordinates_cache.get(address)
+    if cached_coords:
+        return cached_coords
+
+    cached = GeocodedAddress.objects.filter(normalized_address=normalize_address(address)).first()
+    if cached and cached.has_coords():
         print(f"Из кеша: {address} -> ({cached.lat}, {cached.lng})")
+        coordinates_cache.set(address, cached)
         return cached
 
-    api_key = getattr(settings, "YANDEX_GEOCODER_API_KEY", None)
-    if not api_key:
-        print("Нет API-ключа Яндекса в settings.YANDEX_GEOCODER_API_KEY")
+    if cached and cached.in_backoff():
+        print(f"Пропускаем '{address}' до {cached.retry_after}: {cached.get_failure_reason_display()}")
         return cached
 
-    params = {
-        "apikey": api_key,
-        "geocode": address,
-        "format": "json",
-    }
+    client = get_geocoder_client()
+    if not client.api_key:
+        print("Нет API-ключа Яндекса в settings.YANDEX_GEOCODER_API_KEY")
+        return cached
 
+    geo = cached or GeocodedAddress(address=address, provider="yandex")
     try:
-        response = requests.get(YANDEX_GEOCODER_URL, params=params, timeout=5)
-    except Exception as e:
-        print(f"Ошибка сети при запросе к Яндекс Геокодеру для '{address}': {e}")
+        coords = client.geocode(address)
+    except GeocoderUnavailable as e:
+        print(e)
         return cached
+    except GeocoderError as e:
+        print(e)
+        geo.record_failure(e.reason)
+        geo.save()
+        return geo
 
-    if response.status_code != 200:
-        print(f"Яндекс вернул статус {response.status_code} для '{address}': {response.text[:200]}")
-        return cached
+    if coords is None:
+        print(f"Яндекс не нашёл объект для '{address}'")
+        geo.record_failure(GeocodedAddress.NOT_FOUND)
+        geo.save()
+        return geo
 
-    response_data = response.json()
-    try:
-        members = response_data["response"]["GeoObjectCollection"]["featureMember"]
-        if not members:
-            print(f"Яндекс не нашёл объект для '{address}'")
-            return cached
-
-        geo_object = members[0]["GeoObject"]
-        pos = geo_object["Point"]["pos"]
-        lon_str, lat_str = pos.split()
-        lat, lon = float(lat_str), float(lon_str)
-    except Exception as e:
-        print(f"Ошибка разбора ответа Яндекса для '{address}': {e}")
-        return cached
+    lat, lon = coords
+    geo.record_success(lat, lon)
+    geo.provider = "yandex"
+    geo.save()
+
+    print(f"От Яндекса: {address} -> ({lat}, {lon})")
+    return geo
+
+
+def fetch_coordinates_batch(addresses, max_workers=None, errors=None):
+    """
+    Геокодирует много адресов сразу.
+
+    Запросы к Яндексу идут параллельно, не больше max_workers одновременно.
+    Адреса, у которых не подошло время повтора после неудачи, пропускаются,
+    а разные написания одного адреса запрашиваются один раз. Координаты
+    и причины неудач записываются в БД одним bulk_create и одним bulk_update.
+
+    Возвращает словарь {адрес: GeocodedAddress} для всех адресов, по которым
+    в БД есть запись. Если передан словарь errors, в него складываются
+    тексты ошибок по адресам, которые не удалось геокодировать.
+    """
+    if errors is None:
+        errors = {}
+
+    addresses_by_key = {}
+    for address in addresses:
+        if address:
+            addresses_by_key.setdefault(normalize_address(address), []).append(address)
+    if not addresses_by_key:
+        return {}
+
+    now = timezone.now()
+    geocoded_by_key = {
+        geo.normalized_address: geo
+        for geo in GeocodedAddress.objects.filter(normalized_address__in=addresses_by_key)
+    }
+    to_request = [
+        key for key in addresses_by_key
+        if key not in geocoded_by_key
+        or not (geocoded_by_key[key].has_coords() or geocoded_by_key[key].in_backoff(now))
+    ]
+    if not to_request:
+        return _by_address(addresses_by_key, geocoded_by_key)
+
+    client = get_geocoder_client()
+    if not client.api_key:
+        print("Нет API-ключа Яндекса в settings.YANDEX_GEOCODER_API_KEY")
+        for key in to_request:
+            errors.update({address: "Нет API-ключа Яндекса" for address in addresses_by_key[key]})
+        return _by_address(addresses_by_key, geocoded_by_key)
+
+    if max_workers is None:
+        max_workers = getattr(settings, "GEOCODER_MAX_WORKERS", GEOCODER_MAX_WORKERS)
+
+    def request(key):
+        address = addresses_by_key[key][0]
+        try:
+            return key, client.geocode(address)
+        except GeocoderError as e:
+            print(e)
+            return key, e
+
+    # Каждому потоку своя копия контекста: так время запросов к Яндексу
+    # попадает в метрики текущего HTTP-запроса.
+    contexts = [copy_context() for _ in to_request]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda context, key: context.run(request, key), contexts, to_request))
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for key, result in results:
+        if isinstance(result, GeocoderError):
+            errors.update({address: str(result) for address in addresses_by_key[key]})
+        if isinstance(result, GeocoderUnavailable):
+            continue
+
+        geo = geocoded_by_key.get(key)
+        if geo is None:
+            geo = GeocodedAddress(
+                address=addresses_by_key[key][0],
+                normalized_address=key,
+                provider="yandex",
+            )
+            to_create.append(geo)
+            geocoded_by_key[key] = geo
+        else:
+            geo.updated_at = now
+            to_update.append(geo)
 
-    obj, _ = GeocodedAddress.objects.update_or_create(
-        address=address,
-        defaults={
-            "lat": lat,
-            "lng": lon,
-            "provider": "yandex",
-        },
+        if isinstance(result, GeocoderError):
+            geo.record_failure(result.reason, now)
+        elif result is None:
+            geo.record_failure(GeocodedAddress.NOT_FOUND, now)
+        else:
+            geo.record_success(*result)
+
+    GeocodedAddress.objects.bulk_create(to_create, ignore_conflicts=True)
+    if to_update:
+        # Обновляются только записи без координат, поэтому расстояний
+        # в AddressDistance по ним нет и чистить кеш не нужно.
+        GeocodedAddress.objects.bulk_update(
+            to_update,
+            ["lat", "lng", "failure_reason", "failures_count", "retry_after", "updated_at"],
+        )
+
+    if to_create:
+        # С ignore_conflicts Django не проставляет id созданным записям.
+        geocoded_by_key.update({
+            geo.normalized_address: geo
+            for geo in GeocodedAddress.objects.filter(
+                normalized_address__in=[geo.normalized_address for geo in to_create]
+            )
+        })
+
+    coordinates_cache.set_many(
+        geo for geo in geocoded_by_key.values() if geo.id is not None and geo.has_coords()
     )
 
-    print(f"От Яндекса: {address} -> ({lat}, {lon})")
-    return obj
+    found = sum(1 for key, _ in results if key in geocoded_by_key and geocoded_by_key[key].has_coords())
+    print(f"Пакетное геокодирование: запрошено {len(to_request)}, найдено {found}")
+    return _by_address(addresses_by_key, geocoded_by_key)
+
+
+def _by_address(addresses_by_key, geocoded_by_key):
+    return {
+        address: geocoded_by_key[key]
+        for key, addresses in addresses_by_key.items()
+        if key in geocoded_by_key
+        for address in addresses
+    }
+
+
+def enqueue_geocoding(addresses):
+    """
+    Ставит адреса в очередь геокодирования, её разбирает `manage.py geocode_worker`.
+
+    Адреса, у которых уже есть координаты или не подошло время повтора
+    после неудачи, в очередь не попадают. Задачи различаются по
+    нормализованному адресу. Возвращает множество адресов, поставленных
+    в очередь.
+    """
+    addresses = {address for address in addresses if address}
+    if not addresses:
+        return set()
+
+    keys = {address: normalize_address(address) for address in addresses}
+    settled_keys = set(
+        GeocodedAddress.objects
+        .filter(normalized_address__in=set(keys.values()))
+        .filter(Q(lat__isnull=False, lng__isnull=False) | Q(retry_after__gt=timezone.now()))
+        .values_list("normalized_address", flat=True)
+    )
+    pending = {address for address in addresses if keys[address] not in settled_keys}
+
+    # Разные написания одного адреса — одна задача.
+    jobs_by_key = {}
+    for address in sorted(pending):
+        jobs_by_key.setdefault(keys[address], GeocodingJob(address=address, normalized_address=keys[address]))
+    GeocodingJob.objects.bulk_create(jobs_by_key.values(), ignore_conflicts=True)
+    return pending
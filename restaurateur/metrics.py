@@ -0,0 +1,12 @@
+from star_burger.metrics import Counter
+
+
+manager_orders_shown = Counter(
+    'star_burger_manager_orders_shown_total',
+    'Заказов показано на странице заказов менеджера',
+)
+manager_orders_addresses = Counter(
+    'star_burger_manager_orders_addresses_total',
+    'Адреса на странице заказов по источнику координат: cache, db, not_found, pending',
+    labelnames=['source'],
+)
@@ -1,19 +1,26 @@
 from django import forms
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import redirect, render
 from django.views import View
 from django.urls import reverse_lazy
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Sum, IntegerField, Value
-from django.db.models import Case, When
-from django.db.models.functions import Coalesce
+from django.db.models import Q
+from django.utils.crypto import constant_time_compare
 
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 
 from foodcartapp.models import Product, Restaurant, Order
-from geopy.distance import geodesic
+from geo.cache import coordinates_cache
+from geo.distance import HAVERSINE, get_distances
 from geo.models import GeocodedAddress
-from geo.utils import fetch_coordinates
+from geo.normalization import normalize_address
+from geo.spatial import get_restaurant_spatial_index
+from geo.utils import enqueue_geocoding
+from star_burger.metrics import render_prometheus
+
+from .metrics import manager_orders_addresses, manager_orders_shown
 
 
 class Login(forms.Form):
@@ -64,10 +71,132 @@ class LogoutView(auth_views.LogoutView):
     next_page = reverse_lazy('restaurateur:login')
 
 
+class OrdersFilterForm(forms.Form):
+    status = forms.ChoiceField(
+        label='Статус',
+        required=False,
+        choices=[('', 'Все, кроме завершённых')] + Order.STATUS_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан',
+        required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        empty_label='Любой',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    payment_method = forms.ChoiceField(
+        label='Оплата',
+        required=False,
+        choices=[('', 'Любая')] + Order.PAYMENT_METHOD_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    created_from = forms.DateField(
+        label='Создан с',
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+    )
+    created_to = forms.DateField(
+        label='по',
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+    )
+
+
+def parse_orders_cursor(cursor):
+    """Разбирает курсор страницы заказов вида «<порядок статуса>.<id>»."""
+    try:
+        status_rank, order_id = cursor.split('.')
+        return int(status_rank), int(order_id)
+    except (AttributeError, ValueError):
+        return None
+
+
 def is_manager(user):
     return user.is_staff  # FIXME replace with specific permission
 
 
+def attach_restaurant_distances(orders, geocoded_by_address):
+    """
+    Добавляет заказам список доступных ресторанов с расстоянием до них,
+    ближайшие первыми.
+
+    geocoded_by_address — координаты адресов заказов и ресторанов
+    {адрес: объект с id, lat и lng}.
+    """
+    restaurants_by_id = {
+        restaurant.id: restaurant
+        for order in orders
+        for restaurant in order.available_restaurants
+    }
+    restaurant_index = get_restaurant_spatial_index()
+    for restaurant in restaurants_by_id.values():
+        restaurant_geo = geocoded_by_address.get(restaurant.address)
+        if restaurant_geo:
+            restaurant_index.update(restaurant.id, restaurant_geo.lat, restaurant_geo.lng)
+
+    distances = {}
+    for order in orders:
+        order.nearest_restaurants = []
+        order_geo = geocoded_by_address.get(order.address)
+        if not order_geo:
+            continue
+
+        nearest = restaurant_index.nearest(
+            order_geo.lat,
+            order_geo.lng,
+            k=settings.MANAGER_ORDERS_NEAREST_RESTAURANTS,
+            radius_km=settings.MANAGER_ORDERS_RADIUS_KM,
+            point_ids={restaurant.id for restaurant in order.available_restaurants},
+        )
+        for restaurant_id, distance_km in nearest:
+            restaurant = restaurants_by_id[restaurant_id]
+            order.nearest_restaurants.append(restaurant)
+            restaurant_geo = geocoded_by_address.get(restaurant.address)
+            if restaurant_geo:
+                distances[(order_geo.id, restaurant_geo.id)] = distance_km
+
+    if settings.DISTANCE_METHOD != HAVERSINE:
+        # Индекс считает по гаверсинусам, более точные расстояния нужны
+        # только для показанных пар.
+        distances = get_distances(
+            [
+                (geocoded_by_address[order.address], geocoded_by_address[restaurant.address])
+                for order in orders
+                for restaurant in order.nearest_restaurants
+                if restaurant.address in geocoded_by_address
+            ],
+            method=settings.DISTANCE_METHOD,
+        )
+
+    for order in orders:
+        if order.address_not_found or order.address_pending:
+            order.available_restaurants_with_distance = []
+            continue
+
+        order_geo = geocoded_by_address.get(order.address)
+        restaurants_without_coords = [
+            restaurant
+            for restaurant in order.available_restaurants
+            if restaurant.address not in geocoded_by_address
+        ]
+        restaurants_with_distance = []
+
+        for restaurant in order.nearest_restaurants + restaurants_without_coords:
+            restaurant_geo = geocoded_by_address.get(restaurant.address)
+            distance_km = None
+            if order_geo and restaurant_geo:
+                distance_km = round(distances[(order_geo.id, restaurant_geo.id)], 2)
+
+            restaurants_with_distance.append({
+                'restaurant': restaurant,
+                'distance_km': distance_km,
+            })
+
+        restaurants_with_distance.sort(key=lambda x: x['distance_km'] if x['distance_km'] is not None else 999999)
+        order.available_restaurants_with_distance = restaurants_with_distance
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
     restaurants = list(Restaurant.objects.order_by('name'))
@@ -97,35 +226,44 @@ def view_restaurants(request):
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
-    status_order = Case(
-        When(status='UNPROCESSED', then=Value(0)),
-        When(status='NEW', then=Value(1)),
-        When(status='COOKING', then=Value(2)),
-        When(status='DELIVERING', then=Value(3)),
-        When(status='COMPLETED', then=Value(4)),
-        default=Value(5),
-        output_field=IntegerField(),
-    )
+    filter_form = OrdersFilterForm(request.GET)
+    filters = filter_form.cleaned_data if filter_form.is_valid() else {}
 
     orders_qs = (
         Order.objects
-        .with_total_price()
-        .annotate(
-            items_count=Coalesce(
-                Sum('items__quantity'),
-                Value(0),
-                output_field=IntegerField(),
-            ),
-            status_priority=status_order,
-        )
-        .order_by('status_priority', '-id')
+        .order_by('status_rank', '-id')
         .select_related('cooking_restaurant')
         .prefetch_related('items__product')
-        .exclude(status='COMPLETED')
-        .with_available_restaurants()
     )
 
-    orders = list(orders_qs)
+    if filters.get('status'):
+        orders_qs = orders_qs.filter(status=filters['status'])
+    else:
+        orders_qs = orders_qs.not_completed()
+    if filters.get('restaurant'):
+        orders_qs = orders_qs.filter(cooking_restaurant=filters['restaurant'])
+    if filters.get('payment_method'):
+        orders_qs = orders_qs.filter(payment_method=filters['payment_method'])
+    if filters.get('created_from'):
+        orders_qs = orders_qs.filter(created_at__date__gte=filters['created_from'])
+    if filters.get('created_to'):
+        orders_qs = orders_qs.filter(created_at__date__lte=filters['created_to'])
+
+    cursor = parse_orders_cursor(request.GET.get('after'))
+    if cursor:
+        status_rank, order_id = cursor
+        orders_qs = orders_qs.filter(
+            Q(status_rank__gt=status_rank)
+            | Q(status_rank=status_rank, id__lt=order_id)
+        )
+
+    page_size = settings.MANAGER_ORDERS_PAGE_SIZE
+    orders = list(orders_qs[:page_size + 1].with_available_restaurants())
+
+    next_cursor = None
+    if len(orders) > page_size:
+        orders = orders[:page_size]
+        next_cursor = f'{orders[-1].status_rank}.{orders[-1].id}'
 
     addresses = set()
     for order in orders:
@@ -135,48 +273,71 @@ def view_orders(request):
             if restaurant.address:
                 addresses.add(restaurant.address)
 
-    geocoded_addresses = GeocodedAddress.objects.filter(address__in=addresses)
-    coords_by_address = {
-        geo.address: (geo.lat, geo.lng)
-        for geo in geocoded_addresses
-        if geo.lat is not None and geo.lng is not None
+    geocoded_by_address = coordinates_cache.get_many(addresses)
+    cached_addresses = set(geocoded_by_address)
+    keys = {address: normalize_address(address) for address in addresses - geocoded_by_address.keys()}
+    geocoded_by_key = {
+        geo.normalized_address: geo
+        for geo in GeocodedAddress.objects.filter(normalized_address__in=set(keys.values()))
     }
-
-    missing_addresses = [addr for addr in addresses if addr not in coords_by_address]
-
-    for addr in missing_addresses:
-        geo = fetch_coordinates(addr)
-        if geo and geo.lat is not None and geo.lng is not None:
-            coords_by_address[addr] = (geo.lat, geo.lng)
+    geocoded_addresses = {
+        address: geocoded_by_key[key]
+        for address, key in keys.items()
+        if key in geocoded_by_key
+    }
+    for address, geo in geocoded_addresses.items():
+        if geo.has_coords():
+            geocoded_by_address[address] = geo
+            coordinates_cache.set(address, geo)
+
+    not_found_addresses = {
+        address
+        for address, geo in geocoded_addresses.items()
+        if geo.failure_reason == GeocodedAddress.NOT_FOUND
+    }
+    pending_addresses = addresses - geocoded_by_address.keys() - not_found_addresses
+    enqueue_geocoding(addresses - geocoded_by_address.keys())
 
     for order in orders:
-        if order.address and order.address not in coords_by_address:
-            order.address_not_found = True
-        else:
-            order.address_not_found = False
+        order.address_pending = order.address in pending_addresses
+        order.address_not_found = order.address in not_found_addresses
 
-    for order in orders:
-        if order.address_not_found:
-            order.available_restaurants_with_distance = []
-            continue
+    manager_orders_shown.inc(len(orders))
+    manager_orders_addresses.inc(len(addresses & cached_addresses), source='cache')
+    manager_orders_addresses.inc(len(geocoded_by_address.keys() - cached_addresses), source='db')
+    manager_orders_addresses.inc(len(not_found_addresses), source='not_found')
+    manager_orders_addresses.inc(len(pending_addresses), source='pending')
 
-        order_coords = coords_by_address.get(order.address)
-        restaurants_with_distance = []
+    attach_restaurant_distances(orders, geocoded_by_address)
 
-        for restaurant in getattr(order, 'available_restaurants', []):
-            rest_coords = coords_by_address.get(restaurant.address)
-            distance_km = None
-            if order_coords and rest_coords:
-                distance_km = round(geodesic(order_coords, rest_coords).km, 2)
+    next_page_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query['after'] = next_cursor
+        next_page_query = query.urlencode()
 
-            restaurants_with_distance.append({
-                'restaurant': restaurant,
-                'distance_km': distance_km,
-            })
-
-        restaurants_with_distance.sort(key=lambda x: x['distance_km'] if x['distance_km'] is not None else 999999)
-        order.available_restaurants_with_distance = restaurants_with_distance
+    first_page_query = request.GET.copy()
+    first_page_query.pop('after', None)
 
     return render(request, 'order_items.html', {
         'order_items': orders,
+        'filter_form': filter_form,
+        'next_page_query': next_page_query,
+        'first_page_query': first_page_query.urlencode(),
+        'is_first_page': cursor is None,
     })
+
+
+def can_scrape_metrics(request):
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return is_manager(request.user)
+
+
+def view_metrics(request):
+    # Prometheus не умеет логиниться, поэтому вместо редиректа на форму
+    # входа — 403, а сам он приходит с токеном из METRICS_TOKEN.
+    if not can_scrape_metrics(request):
+        return HttpResponseForbidden('Нужен заголовок Authorization: Bearer <METRICS_TOKEN>')
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,222 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+import threading
+import time
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+registry = []
+
+current_request_stats = ContextVar('current_request_stats', default=None)
+
+
+class Histogram:
+    """
+    Гистограмма в памяти процесса с фиксированными границами корзин,
+    отдельная для каждого набора значений меток.
+    """
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def collect(self):
+        """Возвращает {метки: (накопленные счётчики корзин, сумма, количество)}."""
+        with self.lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self.values.items()}
+
+        collected = {}
+        for key, (counts, total, count) in snapshot.items():
+            cumulative = []
+            running = 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            collected[key] = (cumulative, total, count)
+        return collected
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+
+class Counter:
+    """Счётчик в памяти процесса, отдельный для каждого набора значений меток."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def collect(self):
+        with self.lock:
+            return dict(self.values)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+
+class FunctionMetric:
+    """
+    Метрика, значения которой в момент выгрузки отдаёт функция
+    в виде {значения меток: число}. Подходит для счётчиков, которые
+    уже где-то ведутся, например в кеше координат.
+    """
+
+    def __init__(self, name, documentation, metric_type, func, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.func = func
+        self.labelnames = tuple(labelnames)
+        registry.append(self)
+
+    def collect(self):
+        return self.func()
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """Выгружает все метрики процесса в текстовом формате Prometheus."""
+    lines = []
+    for metric in registry:
+        if isinstance(metric, Histogram):
+            metric_type = 'histogram'
+        elif isinstance(metric, Counter):
+            metric_type = 'counter'
+        else:
+            metric_type = metric.metric_type
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric_type}')
+
+        for key, value in sorted(metric.collect().items()):
+            if metric_type != 'histogram':
+                lines.append(f'{metric.name}{format_labels(metric.labelnames, key)} {format_value(value)}')
+                continue
+
+            cumulative, total, count = value
+            for bound, bucket_count in zip(metric.buckets + (float('inf'),), cumulative):
+                labels = format_labels(metric.labelnames, key, [('le', format_value(bound))])
+                lines.append(f'{metric.name}_bucket{labels} {bucket_count}')
+            labels = format_labels(metric.labelnames, key)
+            lines.append(f'{metric.name}_sum{labels} {format_value(total)}')
+            lines.append(f'{metric.name}_count{labels} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    """Счётчики одного запроса: SQL-запросы, время в БД и в геокодере."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.geocoder_time = 0.0
+        self.aliases = set()
+        self.new_connections = set()
+        self.lock = threading.Lock()
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        self.aliases.add(context['connection'].alias)
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            with self.lock:
+                self.queries += 1
+                self.db_time += elapsed
+
+    def add_geocoder_time(self, seconds):
+        with self.lock:
+            self.geocoder_time += seconds
+
+
+@receiver(connection_created)
+def record_connection_created(sender, connection, **kwargs):
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.new_connections.add(connection.alias)
+
+
+def record_geocoder_time(seconds):
+    """Добавляет время HTTP-запроса к геокодеру к текущему запросу, если он замеряется."""
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.add_geocoder_time(seconds)
+
+
+request_duration = Histogram(
+    'star_burger_request_duration_seconds',
+    'Полное время обработки запроса',
+    LATENCY_BUCKETS,
+    labelnames=['view'],
+)
+request_db_duration = Histogram(
+    'star_burger_request_db_duration_seconds',
+    'Время SQL-запросов за один запрос',
+    LATENCY_BUCKETS,
+    labelnames=['view'],
+)
+request_queries = Histogram(
+    'star_burger_request_queries',
+    'Количество SQL-запросов за один запрос',
+    QUERIES_BUCKETS,
+    labelnames=['view'],
+)
+request_geocoder_duration = Histogram(
+    'star_burger_request_geocoder_duration_seconds',
+    'Время HTTP-запросов к геокодеру за один запрос',
+    LATENCY_BUCKETS,
+    labelnames=['view'],
+)
+db_connections = Counter(
+    'star_burger_db_connections_total',
+    'Соединения с БД, которыми пользовались запросы: new — открыто заново, reused — уже было открыто',
+    labelnames=['alias', 'state'],
+)
@@ -0,0 +1,65 @@
+from contextlib import ExitStack
+import random
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import (
+    RequestStats,
+    current_request_stats,
+    db_connections,
+    request_db_duration,
+    request_duration,
+    request_geocoder_duration,
+    request_queries,
+)
+
+
+METRICS_SAMPLE_RATE = 1.0
+
+
+def get_view_name(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return 'unresolved'
+    return resolver_match.view_name
+
+
+class RequestMetricsMiddleware:
+    """
+    Замеряет каждый запрос: полное время, количество и время SQL-запросов,
+    время обращений к геокодеру. Результаты копятся в гистограммах
+    star_burger.metrics отдельно для каждой вьюхи.
+
+    METRICS_SAMPLE_RATE задаёт долю замеряемых запросов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', METRICS_SAMPLE_RATE)
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started_at = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats.db_wrapper))
+                response = self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+        elapsed = time.perf_counter() - started_at
+
+        view = get_view_name(request)
+        request_duration.observe(elapsed, view=view)
+        request_db_duration.observe(stats.db_time, view=view)
+        request_queries.observe(stats.queries, view=view)
+        request_geocoder_duration.observe(stats.geocoder_time, view=view)
+        for alias in stats.aliases:
+            db_connections.inc(alias=alias, state='new' if alias in stats.new_connections else 'reused')
+        return response
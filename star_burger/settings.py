@@ -14,6 +14,21 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 
 YANDEX_GEOCODER_API_KEY = os.getenv('YANDEX_GEOCODER_API_KEY')
+YANDEX_GEOCODER_URL = env.str('YANDEX_GEOCODER_URL', 'https://geocode-maps.yandex.ru/1.x')
+GEOCODER_MAX_WORKERS = env.int('GEOCODER_MAX_WORKERS', 8)
+GEOCODER_RATE_LIMIT = env.float('GEOCODER_RATE_LIMIT', 10)
+GEOCODER_CACHE_SIZE = env.int('GEOCODER_CACHE_SIZE', 10000)
+GEOCODER_CACHE_TTL = env.int('GEOCODER_CACHE_TTL', 600)
+DISTANCE_METHOD = env.str('DISTANCE_METHOD', 'haversine')
+MANAGER_ORDERS_PAGE_SIZE = env.int('MANAGER_ORDERS_PAGE_SIZE', 50)
+MANAGER_ORDERS_NEAREST_RESTAURANTS = env.int('MANAGER_ORDERS_NEAREST_RESTAURANTS', 5)
+MANAGER_ORDERS_RADIUS_KM = env.float('MANAGER_ORDERS_RADIUS_KM', None)
+JSON_COMPRESSION_THRESHOLD = env.int('JSON_COMPRESSION_THRESHOLD', 1024)
+ORDERS_BATCH_MAX_SIZE = env.int('ORDERS_BATCH_MAX_SIZE', 100)
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+METRICS_SAMPLE_RATE = env.float('METRICS_SAMPLE_RATE', 1.0)
+METRICS_TOKEN = env.str('METRICS_TOKEN', '')
+BENCHMARKS_ENABLED = env.bool('BENCHMARKS_ENABLED', False)
 SECRET_KEY = env('SECRET_KEY')
 DEBUG = env.bool('DEBUG', True)
 
@@ -44,8 +59,11 @@ INSTALLED_APPS = [
     'rest_framework',
     'geo',
 ]
+if BENCHMARKS_ENABLED:
+    INSTALLED_APPS.append('benchmarks.apps.BenchmarksConfig')
 
 MIDDLEWARE = [
+    'star_burger.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -103,6 +121,10 @@ DATABASES = {
     )
 }
 
+CACHES = {
+    'default': env.dj_cache_url('CACHE_URL', 'locmem://'),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',